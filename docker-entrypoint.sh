@@ -21,5 +21,16 @@ function _wait_database () {
 }
 
 python manage.py migrate
+python manage.py generate_schema
+
+# "serve" starts the dev server, or gunicorn (see gunicorn.conf.py) with
+# DJANGO_ENV=prod.
+if [ "$1" = "serve" ]; then
+  if [ "$DJANGO_ENV" = "prod" ]; then
+    set -- gunicorn --config gunicorn.conf.py
+  else
+    set -- python manage.py runserver 0.0.0.0:8000
+  fi
+fi
 
 exec "$@"
@@ -0,0 +1,64 @@
+"""
+Gunicorn settings for the production launch mode (``DJANGO_ENV=prod``, see
+``docker-entrypoint.sh``).
+
+https://docs.gunicorn.org/en/20.1.0/settings.html
+
+``kill -HUP`` on the master starts new workers and stops the old ones
+gracefully. Since the application is preloaded in the master, new code is
+only picked up by a new master: send ``USR2`` to start one next to the old
+master, then ``QUIT`` to the old master once it is up.
+"""
+
+import multiprocessing
+import os
+
+# "wsgi" runs social_network.wsgi on threaded workers, "asgi" runs
+# social_network.asgi (and its async read views) on uvicorn workers.
+SERVER_INTERFACE = os.environ.get("SERVER_INTERFACE", "wsgi")
+if SERVER_INTERFACE not in ("wsgi", "asgi"):
+    raise RuntimeError(
+        f"SERVER_INTERFACE must be wsgi or asgi, not {SERVER_INTERFACE!r}"
+    )
+
+cores = multiprocessing.cpu_count()
+
+bind = os.environ.get("SERVER_BIND", "0.0.0.0:8000")
+if SERVER_INTERFACE == "asgi":
+    wsgi_app = "social_network.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+    # An event loop keeps a core busy on its own.
+    workers = int(os.environ.get("WEB_CONCURRENCY", cores))
+else:
+    wsgi_app = "social_network.wsgi:application"
+    worker_class = "gthread"
+    workers = int(os.environ.get("WEB_CONCURRENCY", 2 * cores + 1))
+    threads = int(os.environ.get("SERVER_THREADS", 4))
+
+# Recycle workers to bound slow memory growth; the jitter keeps them from
+# restarting all at once.
+max_requests = int(os.environ.get("SERVER_MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+
+# Import Django once in the master so workers fork with it loaded.
+preload_app = os.environ.get("SERVER_PRELOAD", "1") == "1"
+
+timeout = int(os.environ.get("SERVER_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("SERVER_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Worker heartbeats go to tmpfs; a disk-backed /tmp can stall them in Docker.
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = "-"
+
+
+def when_ready(server):
+    # Workers must not share a database connection opened while preloading.
+    from django.db import connections
+
+    from social_api.pool import close_pools
+
+    connections.close_all()
+    close_pools()
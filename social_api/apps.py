@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SocialApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "social_api"
+
+    def ready(self):
+        from . import signals  # noqa: F401
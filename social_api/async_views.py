@@ -0,0 +1,153 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+from .instrumentation import serializer_data
+from .replicas import ause_replica, read_from_replica
+from .views import FriendshipRequestAPIView, UserFriendsList, UserSearchView
+
+
+class AsyncListMixin:
+    """
+    Async-native ``GET`` for a DRF list view, for ASGI deployments.
+
+    The view stays the DRF view it is mixed into, so its schema,
+    authentication and permission classes, throttles, content negotiation and
+    browsable API are unchanged. Only the I/O of a ``GET`` moves to async
+    APIs: authenticators with an ``aauthenticate`` method (the cached token
+    one) run on the event loop, and rows are fetched with the async ORM, from
+    a read replica like the DRF views. Other authenticators, throttles and
+    the browsable API run in a worker thread; permission classes are checked
+    inline and must not query the database. Every other method is handed to
+    the sync DRF view.
+
+    The view must set ``read_serializer_class`` (see ``ValuesListMixin``), a
+    pagination class with ``apaginate_queryset`` (see ``KeysetPagination``)
+    and a ``get_queryset()`` that only builds the query.
+    """
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        sync_view = super().as_view(*args, **initkwargs)
+        actions = getattr(sync_view, "actions", None)
+
+        async def view(request, *args, **kwargs):
+            if request.method != "GET":
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+            self = cls(**sync_view.initkwargs)
+            if actions is not None:
+                self.action_map = actions
+            return await self.adispatch(request, *args, **kwargs)
+
+        # cls, initkwargs, actions and csrf_exempt, as read by Django, DRF and
+        # drf-spectacular.
+        view.__dict__.update(sync_view.__dict__)
+        del view.__wrapped__
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """
+        ``dispatch`` of a ``GET``, awaiting ``ainitial`` and ``alist``.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            response = await self.alist(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.detach(self.response)
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        if self.get_throttles():
+            await sync_to_async(self.check_throttles)(request)
+
+    async def aperform_authentication(self, request):
+        """
+        ``Request._authenticate``, awaiting ``aauthenticate`` where available.
+        """
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, "aauthenticate"):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(
+                        request
+                    )
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+    async def alist(self, request, *args, **kwargs):
+        serializer_class = self.read_serializer_class
+        with read_from_replica(await ause_replica(request.user)):
+            queryset = serializer_class.values(
+                self.filter_queryset(self.get_queryset())
+            )
+            if self.paginator is not None:
+                page = await self.paginator.apaginate_queryset(queryset, request, self)
+                if page is not None:
+                    data = serializer_data(request, serializer_class(page, many=True))
+                    return self.get_paginated_response(data)
+            rows = [row async for row in queryset]
+        return Response(serializer_data(request, serializer_class(rows, many=True)))
+
+    @staticmethod
+    def detach(response):
+        """
+        Render ``response`` into a plain ``HttpResponse``; Django would render
+        a ``Response`` in a worker thread. The browsable API may query the
+        database, so it is still left to Django.
+        """
+        renderer = getattr(response, "accepted_renderer", None)
+        if renderer is None or isinstance(renderer, BrowsableAPIRenderer):
+            return response
+        response.render()
+        return HttpResponse(
+            response.content, status=response.status_code, headers=response.headers
+        )
+
+
+class AsyncUserSearchView(AsyncListMixin, UserSearchView):
+    """
+    ``UserSearchView`` with an async ``GET``.
+    """
+
+
+class AsyncUserFriendsList(AsyncListMixin, UserFriendsList):
+    """
+    ``UserFriendsList`` with an async ``GET``.
+    """
+
+
+class AsyncPendingRequestList(AsyncListMixin, FriendshipRequestAPIView):
+    """
+    ``FriendshipRequestAPIView`` with an async pending request list; sending
+    a request still goes to the sync viewset.
+    """
+
+    # The router's friend_request/ route documents the same operations.
+    schema = None
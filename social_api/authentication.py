@@ -0,0 +1,165 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+# User columns kept in a cached snapshot, in model field order as required by
+# Model.from_db(). The password hash is deliberately left out; saving a
+# snapshot only writes these (loaded) fields.
+SNAPSHOT_FIELDS = (
+    "id",
+    "is_superuser",
+    "username",
+    "first_name",
+    "last_name",
+    "is_staff",
+    "is_active",
+    "email",
+)
+
+
+class TokenCache:
+    """
+    Cache of token key -> user snapshot, with hit/miss counters.
+
+    Entries live in the Django cache named by ``TOKEN_CACHE_ALIAS`` for
+    ``TOKEN_CACHE_TIMEOUT`` seconds; eviction beyond that is left to the cache
+    backend (locmem culls, Redis applies its LRU policy). Keys are hashed so
+    raw tokens never appear in the cache.
+
+    Entries are dropped when a token is deleted or its user is saved or
+    updated through the ORM (see ``signals`` and ``UserQuerySet.update``).
+    Changes that bypass the ORM, such as raw SQL, are only seen once the
+    entry expires.
+    """
+
+    key_prefix = "token"
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias or getattr(settings, "TOKEN_CACHE_ALIAS", "default")
+        self.timeout = timeout or getattr(settings, "TOKEN_CACHE_TIMEOUT", 300)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def make_key(self, key):
+        return f"{self.key_prefix}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+    def get(self, key):
+        return self._from_snapshot(self.shared.get(self.make_key(key)))
+
+    async def aget(self, key):
+        return self._from_snapshot(await self.shared.aget(self.make_key(key)))
+
+    def set(self, key, user):
+        self.shared.set(self.make_key(key), self._snapshot(user), self.timeout)
+
+    async def aset(self, key, user):
+        await self.shared.aset(self.make_key(key), self._snapshot(user), self.timeout)
+
+    def invalidate(self, *keys):
+        self.shared.delete_many([self.make_key(key) for key in keys])
+
+    def invalidate_users(self, *user_ids):
+        """
+        Drop the cached snapshots of every token of ``user_ids``.
+        """
+        keys = Token.objects.filter(user_id__in=user_ids).values_list("key", flat=True)
+        if keys := list(keys):
+            self.invalidate(*keys)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def _snapshot(self, user):
+        return tuple(getattr(user, field) for field in SNAPSHOT_FIELDS)
+
+    def _from_snapshot(self, snapshot):
+        with self._lock:
+            if snapshot is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if snapshot is None:
+            return None
+        return User.from_db(None, SNAPSHOT_FIELDS, snapshot)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that skips the token/user join on cache hits.
+    """
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            return (user, token)
+
+        return (user, self.snapshot_token(key, user))
+
+    async def aauthenticate(self, request):
+        """
+        ``authenticate`` for async views, using the async cache and ORM APIs.
+        """
+        key = TokenKeyParser().authenticate(request)
+        if key is None:
+            return None
+
+        user = await token_cache.aget(key)
+        if user is not None:
+            return (user, self.snapshot_token(key, user))
+
+        token = await Token.objects.select_related("user").filter(key=key).afirst()
+        if token is None:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        await token_cache.aset(key, token.user)
+        return (token.user, token)
+
+    @staticmethod
+    def snapshot_token(key, user):
+        """
+        Build the request's token from the cache entry, without a query.
+        """
+        token = Token.from_db(None, ("key", "user_id"), (key, user.pk))
+        token.user = user
+        return token
+
+
+class TokenKeyParser(TokenAuthentication):
+    """
+    Returns the key from a ``Token`` authorization header, with DRF's header
+    validation and error messages, without looking it up.
+    """
+
+    def authenticate_credentials(self, key):
+        return key
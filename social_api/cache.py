@@ -0,0 +1,151 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+
+User = get_user_model()
+
+# Rough per-entry bookkeeping cost on top of the array payload.
+ENTRY_OVERHEAD = 128
+
+
+class FriendCache:
+    """
+    Cache of per-user friend id sets.
+
+    Each set is a sorted ``array("q")`` so membership checks are a binary
+    search and a 10k-friend set takes ~80KB. Sets are loaded lazily from the
+    ``social_api_user_friends`` through-table and stored in two tiers:
+
+    * a process-local LRU bounded by ``FRIEND_CACHE_MAX_BYTES``, whose entries
+      expire after ``FRIEND_CACHE_LOCAL_TTL`` seconds so that updates made by
+      other workers become visible;
+    * the Django cache named by ``FRIEND_CACHE_ALIAS`` (locmem in tests, a
+      shared backend such as Redis in production).
+
+    New edges are inserted in place in the local tier and drop the shared
+    entry, so concurrent writers never overwrite each other's updates.
+    """
+
+    key_prefix = "friends"
+
+    def __init__(self, alias=None, max_bytes=None, local_ttl=None, timeout=None):
+        self.alias = alias or getattr(settings, "FRIEND_CACHE_ALIAS", "default")
+        self.max_bytes = max_bytes or getattr(
+            settings, "FRIEND_CACHE_MAX_BYTES", 64 * 1024 * 1024
+        )
+        self.local_ttl = (
+            local_ttl
+            if local_ttl is not None
+            else getattr(settings, "FRIEND_CACHE_LOCAL_TTL", 5)
+        )
+        self.timeout = timeout or getattr(settings, "FRIEND_CACHE_TIMEOUT", 3600)
+        self._local = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def make_key(self, user_id):
+        return f"{self.key_prefix}:{user_id}"
+
+    def get(self, user_id):
+        """
+        Return the sorted friend ids of ``user_id``.
+        """
+        friend_ids = self._get_local(user_id)
+        if friend_ids is not None:
+            return friend_ids
+
+        payload = self.shared.get(self.make_key(user_id))
+        if payload is None:
+            friend_ids = self._load(user_id)
+            self.shared.set(self.make_key(user_id), friend_ids.tobytes(), self.timeout)
+        else:
+            friend_ids = array("q")
+            friend_ids.frombytes(payload)
+
+        self._set_local(user_id, friend_ids)
+        return friend_ids
+
+    def are_friends(self, user_id, other_id):
+        friend_ids = self.get(user_id)
+        index = bisect_left(friend_ids, other_id)
+        return index < len(friend_ids) and friend_ids[index] == other_id
+
+    def add_edge(self, user_id, other_id):
+        """
+        Record a new friendship between ``user_id`` and ``other_id``.
+        """
+        for source, target in ((user_id, other_id), (other_id, user_id)):
+            with self._lock:
+                entry = self._local.get(source)
+                if entry is not None:
+                    friend_ids = entry[0]
+                    index = bisect_left(friend_ids, target)
+                    if index == len(friend_ids) or friend_ids[index] != target:
+                        insort(friend_ids, target)
+                        self._size += friend_ids.itemsize
+                        self._evict()
+            self.shared.delete(self.make_key(source))
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._pop_local(user_id)
+        self.shared.delete_many([self.make_key(user_id) for user_id in user_ids])
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+            self._size = 0
+
+    def _load(self, user_id):
+        return array(
+            "q",
+            User.friends.through.objects.filter(from_user=user_id)
+            .order_by("to_user")
+            .values_list("to_user", flat=True),
+        )
+
+    def _get_local(self, user_id):
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                self._pop_local(user_id)
+                return None
+            self._local.move_to_end(user_id)
+            return entry[0]
+
+    def _set_local(self, user_id, friend_ids):
+        with self._lock:
+            self._pop_local(user_id)
+            self._local[user_id] = (friend_ids, time.monotonic() + self.local_ttl)
+            self._size += self._sizeof(friend_ids)
+            self._evict()
+
+    def _pop_local(self, user_id):
+        entry = self._local.pop(user_id, None)
+        if entry is not None:
+            self._size -= self._sizeof(entry[0])
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._local:
+            _, (friend_ids, _) = self._local.popitem(last=False)
+            self._size -= self._sizeof(friend_ids)
+
+    @staticmethod
+    def _sizeof(friend_ids):
+        return ENTRY_OVERHEAD + len(friend_ids) * friend_ids.itemsize
+
+
+friend_cache = FriendCache()
@@ -0,0 +1,63 @@
+import operator
+from functools import reduce
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections, models
+from django.db.models.functions import Greatest
+from rest_framework import filters
+
+
+class UserSearchFilter(filters.SearchFilter):
+    """
+    Relevance-ranked search over the user name and email fields.
+
+    On PostgreSQL every name lookup is served by the trigram GIN indexes
+    created in migration 0003, and results are ordered by trigram similarity
+    with exact email hits ranked first. Other backends fall back to the plain
+    DRF ``SearchFilter`` behaviour.
+    """
+
+    rank_annotation = "search_rank"
+
+    def filter_queryset(self, request, queryset, view):
+        if connections[queryset.db].vendor != "postgresql":
+            return super().filter_queryset(request, queryset, view)
+
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if not search_fields or not search_terms:
+            return queryset
+
+        conditions = []
+        ranks = []
+        for search_term in search_terms:
+            queries = []
+            similarities = []
+            for search_field in search_fields:
+                orm_lookup = self.construct_search(str(search_field))
+                queries.append(models.Q(**{orm_lookup: search_term}))
+                if orm_lookup.endswith("__icontains"):
+                    field_name = orm_lookup.rsplit("__", 1)[0]
+                    similarities.append(TrigramSimilarity(field_name, search_term))
+                else:
+                    # Exact matches outrank any partial name match.
+                    similarities.append(
+                        models.Case(
+                            models.When(
+                                models.Q(**{orm_lookup: search_term}), then=1.0
+                            ),
+                            default=0.0,
+                            output_field=models.FloatField(),
+                        )
+                    )
+            conditions.append(reduce(operator.or_, queries))
+            ranks.append(
+                Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+            )
+
+        return (
+            queryset.filter(reduce(operator.and_, conditions))
+            .annotate(**{self.rank_annotation: reduce(operator.add, ranks)})
+            .order_by(f"-{self.rank_annotation}", "id")
+        )
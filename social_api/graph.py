@@ -0,0 +1,179 @@
+import operator
+from collections import defaultdict
+from functools import reduce
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .cache import friend_cache
+from .models import Friendship
+
+User = get_user_model()
+
+USER_FIELDS = ("id", "username", "email", "first_name")
+
+
+def mutual_friends(user_id, other_id):
+    """
+    Return the users who are friends with both ``user_id`` and ``other_id``.
+
+    Both conditions join the ``social_api_user_friends`` through-table on its
+    ``(from_user_id, to_user_id)`` unique index; callers page the result
+    (see ``MutualFriendsList``) to bound the rows read per call.
+    """
+    return (
+        User.objects.filter(friends=user_id)
+        .filter(friends=other_id)
+        .only(*USER_FIELDS)
+        .order_by("id")
+    )
+
+
+def friend_suggestions(user_id, limit=20, fanout=500, per_friend=500):
+    """
+    Rank friends-of-friends of ``user_id`` by their number of mutual friends.
+
+    Only the first ``fanout`` friends of the user are expanded, and only the
+    first ``per_friend`` friends of each of those are read, so a call reads
+    at most ``fanout * per_friend`` edges however high the degrees are.
+    Users who are already friends with ``user_id`` are excluded. Return up to
+    ``limit`` users, each with a ``mutual_friends`` count.
+    """
+    through = User.friends.through
+    friend_ids = through.objects.filter(from_user=user_id).values("to_user")
+    # The per_friend-th friend of each expanded friend (None if it has fewer),
+    # found with an index seek instead of reading the whole list.
+    cutoffs = (
+        through.objects.filter(from_user=user_id)
+        .order_by("to_user")
+        .annotate(
+            cutoff=Subquery(
+                through.objects.filter(from_user=OuterRef("to_user"))
+                .order_by("to_user")
+                .values("to_user")[per_friend - 1 : per_friend]
+            )
+        )
+        .values_list("to_user", "cutoff")[:fanout]
+    )
+    # One range scan of the (from_user, to_user) unique index per friend.
+    small, edges = [], []
+    for friend_id, cutoff in cutoffs:
+        if cutoff is None:
+            small.append(friend_id)
+        else:
+            edges.append(Q(from_user=friend_id, to_user__lte=cutoff))
+    if small:
+        edges.append(Q(from_user__in=small))
+    if not edges:
+        return []
+
+    ranked = list(
+        through.objects.filter(reduce(operator.or_, edges))
+        .exclude(to_user=user_id)
+        .exclude(to_user__in=friend_ids)
+        .values("to_user")
+        .annotate(mutual_friends=Count("*"))
+        .order_by("-mutual_friends", "to_user")
+        .values_list("to_user", "mutual_friends")[:limit]
+    )
+    users = User.objects.only(*USER_FIELDS).in_bulk([pk for pk, _ in ranked])
+    suggestions = []
+    for pk, mutual_friends in ranked:
+        user = users[pk]
+        user.mutual_friends = mutual_friends
+        suggestions.append(user)
+    return suggestions
+
+
+def add_friend_edges(pairs):
+    """
+    Make each ``(user_id, friend_id)`` pair friends.
+
+    Both directions of every new pair go into the through-table in one
+    INSERT, and the ``friend_count`` of both users is recounted.
+    ``bulk_create`` sends no ``m2m_changed`` signal, so the friend cache is
+    updated here once the transaction commits.
+    """
+    through = User.friends.through
+    # The edges are symmetric, so (a, b) and (b, a) are the same pair.
+    pairs = list(dict.fromkeys(tuple(sorted(pair)) for pair in pairs))
+    existing = set(
+        through.objects.filter(
+            from_user__in={user_id for user_id, _ in pairs},
+            to_user__in={friend_id for _, friend_id in pairs},
+        ).values_list("from_user", "to_user")
+    )
+    pairs = [pair for pair in pairs if pair not in existing]
+    through.objects.bulk_create(
+        [
+            through(from_user_id=source, to_user_id=target)
+            for user_id, friend_id in pairs
+            for source, target in ((user_id, friend_id), (friend_id, user_id))
+        ],
+        ignore_conflicts=True,
+    )
+    # A concurrent request may have inserted some of the pairs since they were
+    # read, and ignore_conflicts skips those, so the counts come from the
+    # edges that are actually there rather than from len(pairs).
+    User.objects.filter(pk__in={user_id for pair in pairs for user_id in pair}).update(
+        friend_count=count_subquery(through.objects.all(), "from_user")
+    )
+    for user_id, friend_id in pairs:
+        transaction.on_commit(
+            lambda user_id=user_id, friend_id=friend_id: friend_cache.add_edge(
+                user_id, friend_id
+            )
+        )
+
+
+def adjust_counts(field, deltas):
+    """
+    Add ``deltas[user_id]`` to the ``field`` counter of each user, with one
+    ``UPDATE ... SET field = field + delta`` per distinct delta.
+    """
+    user_ids_by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            user_ids_by_delta[delta].append(user_id)
+    for delta, user_ids in user_ids_by_delta.items():
+        User.objects.filter(pk__in=user_ids).update(**{field: F(field) + delta})
+
+
+def count_subquery(queryset, field):
+    """
+    Count the rows of ``queryset`` whose ``field`` is the outer user.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("*"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def reconcile_counts(users, dry_run=False):
+    """
+    Recount ``friend_count`` and ``pending_request_count`` of ``users`` and
+    fix the ones that drifted. Return the ids of the drifted users.
+    """
+    friends = count_subquery(User.friends.through.objects.all(), "from_user")
+    pending = count_subquery(Friendship.objects.filter(status="pending"), "to_user")
+    drifted = list(
+        users.annotate(actual_friends=friends, actual_pending=pending)
+        .filter(
+            ~Q(friend_count=F("actual_friends"))
+            | ~Q(pending_request_count=F("actual_pending"))
+        )
+        .values_list("pk", flat=True)
+    )
+    if drifted and not dry_run:
+        User.objects.filter(pk__in=drifted).update(
+            friend_count=friends, pending_request_count=pending
+        )
+    return drifted
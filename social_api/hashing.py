@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class ConfigurablePBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher whose cost comes from ``PASSWORD_HASH_ITERATIONS``.
+
+    It keeps the ``pbkdf2_sha256`` algorithm name, so existing hashes stay
+    valid and are upgraded on the next login when the cost changes.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(
+            settings,
+            "PASSWORD_HASH_ITERATIONS",
+            hashers.PBKDF2PasswordHasher.iterations,
+        )
+
+
+class HashingBusy(APIException):
+    """
+    Raised when the password hashing pool has no free slot.
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Server is busy, please retry shortly."
+    default_code = "hashing_busy"
+    wait = 1
+
+
+def init_worker():
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_network.settings")
+    django.setup()
+
+
+class PasswordHashPool:
+    """
+    Bounded process pool for password hashing.
+
+    At most ``PASSWORD_HASH_WORKERS`` hashes run at once and at most
+    ``PASSWORD_HASH_QUEUE_SIZE`` more wait for a worker; any further request
+    fails fast with ``HashingBusy`` (503 + ``Retry-After``) instead of tying up
+    a request worker. ``PASSWORD_HASH_WORKERS = 0`` hashes inline.
+    """
+
+    def __init__(self, workers=None, queue_size=None, timeout=None):
+        self.workers = (
+            workers
+            if workers is not None
+            else getattr(settings, "PASSWORD_HASH_WORKERS", 1)
+        )
+        self.queue_size = (
+            queue_size
+            if queue_size is not None
+            else getattr(settings, "PASSWORD_HASH_QUEUE_SIZE", 4 * self.workers)
+        )
+        self.timeout = timeout or getattr(settings, "PASSWORD_HASH_TIMEOUT", 10)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def _executor(self):
+        with self._lock:
+            # Pools do not survive a fork, so each server worker gets its own.
+            # Its processes come from a fork server rather than a fork of this
+            # threaded worker, which can copy a lock another thread holds.
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                    initializer=init_worker,
+                )
+                self._pid = os.getpid()
+            return self._pool
+
+    def run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HashingBusy() from None
+
+    def make_password(self, password):
+        return self.run(hashers.make_password, password)
+
+    def check_password(self, password, user):
+        """
+        Check ``password`` against ``user`` and upgrade an outdated hash.
+        """
+        if not user.has_usable_password():
+            return False
+        if not self.run(hashers.check_password, password, user.password):
+            return False
+        if hashers.identify_hasher(user.password).must_update(user.password):
+            user.password = self.make_password(password)
+            user.save(update_fields=["password"])
+        return True
+
+
+password_hash_pool = PasswordHashPool()
@@ -0,0 +1,200 @@
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+class RequestMetrics:
+    """
+    Queries, database time, serializer time and render time of one request.
+
+    Instances are installed as a ``connection.execute_wrapper`` on every
+    database alias for the duration of the request.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """
+        Number of executions that repeat the SQL of an earlier one, the usual
+        sign of an N+1 pattern.
+        """
+        return sum(count - 1 for count in self.statements.values())
+
+
+class QueryStats:
+    """
+    Thread-safe per-view aggregates of ``RequestMetrics``.
+    """
+
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, metrics, total_time):
+        with self._lock:
+            stats = self._views.setdefault(
+                view,
+                {
+                    "requests": 0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "duplicates": 0,
+                    "db_time": 0.0,
+                    "serialize_time": 0.0,
+                    "render_time": 0.0,
+                    "total_time": 0.0,
+                    "duplicate_statements": Counter(),
+                },
+            )
+            stats["requests"] += 1
+            stats["queries"] += metrics.queries
+            stats["max_queries"] = max(stats["max_queries"], metrics.queries)
+            stats["duplicates"] += metrics.duplicates
+            stats["db_time"] += metrics.db_time
+            stats["serialize_time"] += metrics.serialize_time
+            stats["render_time"] += metrics.render_time
+            stats["total_time"] += total_time
+            for sql, count in metrics.statements.items():
+                if count > 1:
+                    stats["duplicate_statements"][sql] += count - 1
+
+    def snapshot(self, top=5):
+        """
+        Return per-view averages (times in milliseconds) and the most
+        repeated statements of each view.
+        """
+        with self._lock:
+            views = {
+                view: {
+                    **stats,
+                    "duplicate_statements": stats["duplicate_statements"].copy(),
+                }
+                for view, stats in self._views.items()
+            }
+        return {
+            view: {
+                "requests": stats["requests"],
+                "queries_mean": round(stats["queries"] / stats["requests"], 2),
+                "queries_max": stats["max_queries"],
+                "duplicates_mean": round(stats["duplicates"] / stats["requests"], 2),
+                "db_ms_mean": round(1000 * stats["db_time"] / stats["requests"], 3),
+                "serialize_ms_mean": round(
+                    1000 * stats["serialize_time"] / stats["requests"], 3
+                ),
+                "render_ms_mean": round(
+                    1000 * stats["render_time"] / stats["requests"], 3
+                ),
+                "total_ms_mean": round(
+                    1000 * stats["total_time"] / stats["requests"], 3
+                ),
+                "top_duplicates": [
+                    {"sql": sql, "repeats": count}
+                    for sql, count in stats["duplicate_statements"].most_common(top)
+                ],
+            }
+            for view, stats in views.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+query_stats = QueryStats()
+
+
+def serializer_data(request, serializer):
+    """
+    Return ``serializer.data``, timed as serialization when ``request`` is
+    instrumented. Queries run on the way, e.g. to evaluate a lazy queryset,
+    stay in the database time.
+    """
+    metrics = getattr(request, "_query_metrics", None)
+    if metrics is None:
+        return serializer.data
+    started = time.perf_counter()
+    db_time = metrics.db_time
+    try:
+        return serializer.data
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.serialize_time += elapsed - (metrics.db_time - db_time)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Count and time the SQL of each request, time serializers (see
+    ``serializer_data``) and response rendering and report them in a ``Server-Timing`` header and in ``query_stats``.
+
+    Enabled by ``QUERY_INSTRUMENTATION``; when it is off the middleware
+    removes itself from the chain at startup and costs nothing per request.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "QUERY_INSTRUMENTATION", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        request._query_metrics = metrics
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(metrics))
+            response = self.get_response(request)
+        total_time = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        query_stats.record(view, metrics, total_time)
+
+        app_time = (
+            total_time - metrics.db_time - metrics.serialize_time - metrics.render_time
+        )
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} '
+                f'queries, {metrics.duplicates} duplicates"',
+                f"serialize;dur={metrics.serialize_time * 1000:.2f}",
+                f"render;dur={metrics.render_time * 1000:.2f}",
+                f"app;dur={app_time * 1000:.2f}",
+                f"total;dur={total_time * 1000:.2f}",
+            ]
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Time ``response.render()``, i.e. the renderer's serialization of the
+        response data. Placed early in ``MIDDLEWARE``, this hook runs just
+        before ``render()``; the end is taken in a post-render callback.
+        """
+        metrics = request._query_metrics
+        started = time.perf_counter()
+
+        def stop(response):
+            metrics.render_time += time.perf_counter() - started
+
+        response.add_post_render_callback(stop)
+        return response
@@ -0,0 +1,402 @@
+import json
+import logging
+import random
+import statistics
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from social_api.graph import reconcile_counts
+from social_api.models import Friendship
+
+User = get_user_model()
+
+PASSWORD = "benchmark-password"
+FIRST_NAMES = [
+    "John", "Jane", "Alex", "Maria", "Wei", "Priya", "Omar", "Sara", "Liam",
+    "Emma", "Noah", "Olivia", "Lucas", "Mia", "Ivan", "Aisha", "Kenji", "Elena",
+]  # fmt: skip
+LAST_NAMES = [
+    "Smith", "Doe", "Garcia", "Chen", "Patel", "Khan", "Kim", "Silva", "Novak",
+    "Brown", "Ito", "Rossi", "Muller", "Haddad", "Okafor", "Larsen",
+]  # fmt: skip
+
+DEFAULT_MIX = {
+    "search_user": 35,
+    "user_friend_list": 25,
+    "pending_requests": 15,
+    "friend_request": 10,
+    "login": 10,
+    "register": 5,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic social graph and measure latency, throughput and "
+        "query counts per endpoint through the Django test client. Runs "
+        "against a throwaway test database unless --current-db is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--mean-degree", type=float, default=20, help="Average friends per user."
+        )
+        parser.add_argument(
+            "--degree-distribution",
+            choices=["powerlaw", "uniform"],
+            default="powerlaw",
+        )
+        parser.add_argument(
+            "--pending",
+            type=float,
+            default=2,
+            help="Average pending requests per user.",
+        )
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument(
+            "--mix",
+            default=",".join(
+                f"{name}={weight}" for name, weight in DEFAULT_MIX.items()
+            ),
+            help="Comma separated endpoint=weight pairs.",
+        )
+        parser.add_argument(
+            "--replay",
+            help="JSON Lines file of requests to replay instead of a generated mix.",
+        )
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument(
+            "--current-db",
+            action="store_true",
+            help="Seed and run against the configured database.",
+        )
+        parser.add_argument(
+            "--keepdb", action="store_true", help="Keep the test database."
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.page_size = options["page_size"]
+        mix = self.parse_mix(options["mix"])
+
+        old_config = None
+        if not options["current_db"]:
+            setup_test_environment()
+            old_config = setup_databases(
+                verbosity=0, interactive=False, keepdb=options["keepdb"]
+            )
+        try:
+            started = time.perf_counter()
+            self.seed(
+                options["users"],
+                options["mean_degree"],
+                options["degree_distribution"],
+                options["pending"],
+            )
+            seed_seconds = time.perf_counter() - started
+
+            if options["replay"]:
+                operations = self.replay(options["replay"])
+            else:
+                operations = (
+                    self.generate(self.pick(mix)) for _ in range(options["requests"])
+                )
+            report = self.run(operations)
+        finally:
+            if old_config is not None:
+                teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+                teardown_test_environment()
+
+        report["meta"] = {
+            "commit": self.git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "database": connection.vendor,
+            "users": options["users"],
+            "mean_degree": options["mean_degree"],
+            "degree_distribution": options["degree_distribution"],
+            "seed_seconds": round(seed_seconds, 3),
+            "options": {
+                key: options[key]
+                for key in ("requests", "mix", "replay", "page_size", "seed")
+            },
+        }
+        self.print_summary(report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def parse_mix(self, value):
+        try:
+            mix = {
+                name.strip(): float(weight)
+                for name, weight in (pair.split("=") for pair in value.split(","))
+            }
+        except ValueError as e:
+            raise CommandError(f"Invalid --mix {value!r}") from e
+        unknown = set(mix) - set(DEFAULT_MIX)
+        if unknown:
+            raise CommandError(f"Unknown endpoints in --mix: {', '.join(unknown)}")
+        return mix
+
+    def pick(self, mix):
+        return self.rng.choices(list(mix), weights=list(mix.values()))[0]
+
+    def seed(self, total_users, mean_degree, distribution, pending):
+        """
+        Insert users, friendships, pending requests and tokens in bulk.
+        """
+        password = make_password(PASSWORD)
+        # Only users created by this run are used, so reruns with --current-db
+        # or --keepdb never reuse earlier rows.
+        offset = User.objects.aggregate(last=Max("id"))["last"] or 0
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f"bench{offset + i}",
+                    email=f"bench{offset + i}@example.com",
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password=password,
+                )
+                for i in range(total_users)
+            ),
+            batch_size=1000,
+        )
+        self.emails = dict(
+            User.objects.filter(pk__gt=offset).order_by("id").values_list("id", "email")
+        )
+        self.user_ids = list(self.emails)
+        if len(self.user_ids) < 2:
+            raise CommandError("At least two users are needed.")
+
+        # Each user starts half of its edges; the other half arrive from peers.
+        edges = set()
+        for user_id in self.user_ids:
+            if distribution == "powerlaw":
+                # Pareto with alpha=2 has mean 2 * xm.
+                degree = self.rng.paretovariate(2) * mean_degree / 2
+            else:
+                degree = self.rng.uniform(0, 2 * mean_degree)
+            for _ in range(min(int(degree / 2), len(self.user_ids) - 1)):
+                friend_id = self.rng.choice(self.user_ids)
+                if friend_id != user_id:
+                    edges.add((min(user_id, friend_id), max(user_id, friend_id)))
+        through = User.friends.through
+        through.objects.bulk_create(
+            (
+                through(from_user_id=source, to_user_id=target)
+                for user_id, friend_id in edges
+                for source, target in ((user_id, friend_id), (friend_id, user_id))
+            ),
+            batch_size=5000,
+            ignore_conflicts=True,
+        )
+
+        # Keyed by the unordered pair, like unique_friendship_pair.
+        requests = {}
+        for _ in range(int(pending * len(self.user_ids))):
+            sender_id, receiver_id = self.rng.sample(self.user_ids, 2)
+            pair = (min(sender_id, receiver_id), max(sender_id, receiver_id))
+            if pair not in edges:
+                requests.setdefault(pair, (sender_id, receiver_id))
+        Friendship.objects.bulk_create(
+            (
+                Friendship(from_user_id=sender_id, to_user_id=receiver_id)
+                for sender_id, receiver_id in requests.values()
+            ),
+            batch_size=5000,
+        )
+        # The bulk inserts above bypass the denormalized counters.
+        reconcile_counts(User.objects.filter(pk__gt=offset))
+
+        tokens = [Token(key=Token.generate_key(), user_id=i) for i in self.user_ids]
+        Token.objects.bulk_create(tokens, batch_size=5000)
+        self.tokens = dict(zip(self.user_ids, (token.key for token in tokens)))
+        self.registered = 0
+        self.stdout.write(
+            f"Seeded {len(self.user_ids)} users, {len(edges)} friendships and "
+            f"{len(requests)} pending requests."
+        )
+
+    def generate(self, endpoint):
+        """
+        Build one ``(endpoint, method, path, data, user id)`` operation.
+        """
+        user_id = self.rng.choice(self.user_ids)
+        if endpoint == "search_user":
+            # Prefixes exercise the trigram path as well as exact names.
+            term = self.rng.choice(FIRST_NAMES + LAST_NAMES)
+            term = term[: self.rng.randint(3, len(term))]
+            data = {"search": term, "page_size": self.page_size}
+            return endpoint, "get", "/search_user/", data, user_id
+        if endpoint == "user_friend_list":
+            data = {"page_size": self.page_size}
+            return endpoint, "get", "/user_friend_list/", data, user_id
+        if endpoint == "pending_requests":
+            data = {"page_size": self.page_size}
+            return endpoint, "get", "/friend_request/", data, user_id
+        if endpoint == "friend_request":
+            data = {"to_user": self.rng.choice(self.user_ids)}
+            return endpoint, "post", "/friend_request/", data, user_id
+        if endpoint == "login":
+            data = {"email": self.emails[user_id], "password": PASSWORD}
+            return endpoint, "post", "/login/", data, None
+        self.registered += 1
+        username = f"benchnew{self.registered}-{self.rng.getrandbits(32):x}"
+        data = {
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": PASSWORD,
+            "password2": PASSWORD,
+            "first_name": self.rng.choice(FIRST_NAMES),
+            "last_name": self.rng.choice(LAST_NAMES),
+        }
+        return endpoint, "post", "/register/", data, None
+
+    def replay(self, path):
+        """
+        Yield operations from a JSON Lines file. Each line holds ``method``,
+        ``path`` and optionally ``data``, ``name`` and ``auth``; authenticated
+        requests run as a random seeded user.
+        """
+        try:
+            stream = open(path, encoding="utf-8")
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}") from e
+        with stream:
+            for line_number, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    method, url = entry["method"].lower(), entry["path"]
+                except (ValueError, KeyError) as e:
+                    raise CommandError(f"line {line_number}: invalid entry ({e})")
+                user_id = (
+                    self.rng.choice(self.user_ids) if entry.get("auth", True) else None
+                )
+                name = entry.get("name") or url.strip("/").split("/")[0]
+                yield name, method, url, entry.get("data"), user_id
+
+    def run(self, operations):
+        client = APIClient()
+        samples = defaultdict(list)
+        queries = defaultdict(list)
+        statuses = defaultdict(Counter)
+        # 4xx responses (e.g. duplicate friend requests) are counted, not logged.
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+
+        started = time.perf_counter()
+        for endpoint, method, path, data, user_id in operations:
+            if user_id is None:
+                client.credentials()
+            else:
+                client.credentials(HTTP_AUTHORIZATION=f"Token {self.tokens[user_id]}")
+            # A fresh address per request keeps the per-IP throttles out of
+            # the measurement; per-user throttles still apply.
+            address = f"10.{self.rng.randrange(256)}.{self.rng.randrange(256)}.1"
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = getattr(client, method)(
+                    path, data, format=None if method == "get" else "json",
+                    REMOTE_ADDR=address,
+                )  # fmt: skip
+                elapsed = time.perf_counter() - request_started
+            samples[endpoint].append(elapsed)
+            queries[endpoint].append(len(captured))
+            statuses[endpoint][response.status_code] += 1
+        wall_seconds = time.perf_counter() - started
+
+        endpoints = {}
+        for endpoint, latencies in samples.items():
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "statuses": {
+                    str(code): count for code, count in statuses[endpoint].items()
+                },
+                "req_per_sec": round(len(latencies) / sum(latencies), 1),
+                **self.percentiles(latencies),
+                "queries_mean": round(statistics.fmean(queries[endpoint]), 2),
+                "queries_max": max(queries[endpoint]),
+            }
+        total = sum(len(latencies) for latencies in samples.values())
+        return {
+            "total": {
+                "requests": total,
+                "wall_seconds": round(wall_seconds, 3),
+                "req_per_sec": round(total / wall_seconds, 1) if wall_seconds else 0,
+            },
+            "endpoints": endpoints,
+        }
+
+    @staticmethod
+    def percentiles(latencies):
+        """
+        Return mean, p50, p95 and p99 latency in milliseconds.
+        """
+        if len(latencies) > 1:
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = latencies[0]
+        return {
+            f"{name}_ms": round(value * 1000, 3)
+            for name, value in (
+                ("mean", statistics.fmean(latencies)),
+                ("p50", p50),
+                ("p95", p95),
+                ("p99", p99),
+            )
+        }
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_summary(self, report):
+        self.stdout.write(
+            f"{'endpoint':<18}{'requests':>9}{'req/s':>9}{'p50 ms':>9}"
+            f"{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        )
+        for endpoint, stats in sorted(report["endpoints"].items()):
+            self.stdout.write(
+                f"{endpoint:<18}{stats['requests']:>9}{stats['req_per_sec']:>9}"
+                f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}"
+                f"{stats['p99_ms']:>9.1f}{stats['queries_mean']:>9}"
+            )
+        total = report["total"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total['requests']} requests in {total['wall_seconds']}s, "
+                f"{total['req_per_sec']} req/s."
+            )
+        )
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import ModuleType
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import include, path
+
+from social_api.authentication import token_cache
+from social_api.urls import async_read_urlpatterns, sync_read_urlpatterns
+
+from .benchmark import DEFAULT_MIX
+from .benchmark import Command as BenchmarkCommand
+
+READ_MIX = {
+    name: DEFAULT_MIX[name]
+    for name in ("search_user", "user_friend_list", "pending_requests")
+}
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Compare the throughput and latency of the read endpoints served by "
+        "the sync DRF views through Django's WSGI handler with the async views "
+        "through its ASGI handler, at several levels of concurrency."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(
+            requests=1000,
+            mix=",".join(f"{name}={weight}" for name, weight in READ_MIX.items()),
+        )
+        parser.add_argument(
+            "--concurrency",
+            default="1,10,100,1000",
+            help="Comma separated numbers of requests in flight.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="WSGI worker threads; requests beyond this wait for a thread.",
+        )
+        parser.add_argument(
+            "--interface",
+            choices=["wsgi", "asgi"],
+            action="append",
+            help="Interface to measure, repeatable. Defaults to both.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.levels = [int(level) for level in options["concurrency"].split(",")]
+        except ValueError as e:
+            raise CommandError(
+                f"Invalid --concurrency {options['concurrency']!r}"
+            ) from e
+        if min(self.levels) < 1 or options["threads"] < 1:
+            raise CommandError("--concurrency and --threads must be positive.")
+        self.threads = options["threads"]
+        self.interfaces = options["interface"] or ["wsgi", "asgi"]
+        super().handle(*args, **options)
+
+    def run(self, operations):
+        operations = list(operations)
+        # 4xx responses are counted, not logged.
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+
+        report = {"interfaces": {}}
+        for interface in self.interfaces:
+            if interface == "wsgi":
+                measure, patterns = self.run_wsgi, sync_read_urlpatterns
+            else:
+                measure, patterns = async_to_sync(self.run_asgi), async_read_urlpatterns
+            levels = report["interfaces"][interface] = {}
+            with override_settings(ROOT_URLCONF=self.urlconf(patterns)):
+                for concurrency in self.levels:
+                    # Every run starts with a cold token cache.
+                    token_cache.invalidate(*self.tokens.values())
+                    started = time.perf_counter()
+                    results = measure(operations, concurrency)
+                    wall_seconds = time.perf_counter() - started
+                    levels[str(concurrency)] = {
+                        "requests": len(results),
+                        "statuses": {
+                            str(code): count
+                            for code, count in Counter(
+                                status for status, _ in results
+                            ).items()
+                        },
+                        "wall_seconds": round(wall_seconds, 3),
+                        "req_per_sec": round(len(results) / wall_seconds, 1),
+                        **self.percentiles([latency for _, latency in results]),
+                    }
+        return report
+
+    @staticmethod
+    def urlconf(read_urlpatterns):
+        """
+        Build a URLconf serving ``read_urlpatterns`` in front of the project's
+        URLs, regardless of ``ASYNC_READ_VIEWS``.
+        """
+        urlconf = ModuleType("benchmark_urls")
+        urlconf.urlpatterns = [
+            *read_urlpatterns,
+            path("", include("social_network.urls")),
+        ]
+        return urlconf
+
+    def request_kwargs(self, method, data, user_id):
+        kwargs = {"data": data}
+        if method != "get":
+            kwargs["content_type"] = "application/json"
+        if user_id is not None:
+            kwargs["headers"] = {"Authorization": f"Token {self.tokens[user_id]}"}
+        return kwargs
+
+    def run_wsgi(self, operations, concurrency):
+        """
+        Keep ``concurrency`` requests in flight on a pool of ``--threads``
+        threads, like a threaded WSGI server. Latency includes the time a
+        request waits for a free thread.
+        """
+        workers = min(concurrency, self.threads)
+        local = threading.local()
+
+        def send(method, url, data, user_id):
+            if not hasattr(local, "client"):
+                local.client = Client()
+            response = getattr(local.client, method)(
+                url, **self.request_kwargs(method, data, user_id)
+            )
+            return response.status_code, time.perf_counter()
+
+        results = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            remaining = iter(operations)
+            in_flight = {}
+            while True:
+                for _, method, url, data, user_id in remaining:
+                    future = executor.submit(send, method, url, data, user_id)
+                    in_flight[future] = time.perf_counter()
+                    if len(in_flight) == concurrency:
+                        break
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    status, finished = future.result()
+                    results.append((status, finished - in_flight.pop(future)))
+
+            # Close each worker's connection; the barrier makes every thread
+            # take exactly one of these tasks.
+            barrier = threading.Barrier(workers)
+
+            def close_connections():
+                barrier.wait()
+                connections.close_all()
+
+            for _ in range(workers):
+                executor.submit(close_connections)
+        return results
+
+    async def run_asgi(self, operations, concurrency):
+        """
+        Keep ``concurrency`` requests in flight as tasks on one event loop,
+        like a single ASGI worker process.
+        """
+        remaining = iter(operations)
+        results = []
+
+        async def client():
+            async_client = AsyncClient()
+            for _, method, url, data, user_id in remaining:
+                started = time.perf_counter()
+                response = await getattr(async_client, method)(
+                    url, **self.request_kwargs(method, data, user_id)
+                )
+                results.append((response.status_code, time.perf_counter() - started))
+
+        await asyncio.gather(
+            *(client() for _ in range(min(concurrency, len(operations))))
+        )
+        return results
+
+    def print_summary(self, report):
+        self.stdout.write(
+            f"{'interface':<10}{'clients':>9}{'req/s':>9}{'p50 ms':>9}"
+            f"{'p95 ms':>9}{'p99 ms':>9}  statuses"
+        )
+        for interface, levels in report["interfaces"].items():
+            for concurrency, stats in levels.items():
+                statuses = ", ".join(
+                    f"{code}: {count}"
+                    for code, count in sorted(stats["statuses"].items())
+                )
+                self.stdout.write(
+                    f"{interface:<10}{concurrency:>9}{stats['req_per_sec']:>9}"
+                    f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}"
+                    f"{stats['p99_ms']:>9.1f}  {statuses}"
+                )
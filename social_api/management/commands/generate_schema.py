@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from social_api.schema import generate_schema_documents, schema_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema served at /api/schema/ and store it in "
+        "SCHEMA_CACHE_FILE, so server processes start with it ready."
+    )
+
+    def handle(self, *args, **options):
+        schema_cache.clear()
+        generate_schema_documents()
+        self.stdout.write(
+            self.style.SUCCESS(f"Schema written to {schema_cache.path or 'memory'}.")
+        )
@@ -0,0 +1,204 @@
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth import get_user_model, hashers
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from social_api.hashing import init_worker
+
+User = get_user_model()
+
+FIELDS = ("username", "email", "first_name", "last_name")
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users from a CSV (with a header row) or JSON Lines file. Rows "
+        "carry username, email, first_name, last_name and either a raw "
+        "password or an already encoded Django password_hash."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or '-' for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Input format, guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Rows validated, hashed and inserted per batch.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Password hashing processes; 0 hashes in this process.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"] or (
+            "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+        )
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        # Uniqueness is checked against these sets instead of per-row queries.
+        self.emails = {
+            email.lower()
+            for email in User.objects.values_list("email", flat=True).iterator()
+        }
+        self.usernames = set(User.objects.values_list("username", flat=True).iterator())
+
+        self.workers = options["workers"]
+        executor = (
+            ProcessPoolExecutor(self.workers, initializer=init_worker)
+            if self.workers
+            else None
+        )
+        imported = skipped = 0
+        started = time.monotonic()
+        try:
+            with self.open(path) as stream:
+                rows = self.read_rows(stream, input_format)
+                while chunk := list(islice(rows, options["chunk_size"])):
+                    users = self.build_users(chunk, executor)
+                    created = self.insert(users)
+                    imported += created
+                    skipped += len(chunk) - created
+                    elapsed = max(time.monotonic() - started, 1e-6)
+                    self.stdout.write(
+                        f"{imported} imported, {skipped} skipped, "
+                        f"{(imported + skipped) / elapsed:.0f} rows/sec"
+                    )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} users ({skipped} skipped) in {elapsed:.1f}s, "
+                f"{(imported + skipped) / elapsed:.0f} rows/sec."
+            )
+        )
+
+    def open(self, path):
+        if path == "-":
+            return contextlib.nullcontext(sys.stdin)
+        try:
+            return open(path, encoding="utf-8", newline="")
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}") from e
+
+    def read_rows(self, stream, input_format):
+        """
+        Yield ``(line number, row dict)`` pairs without loading the file.
+        """
+        if input_format == "csv":
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                self.stderr.write(f"line {line_number}: invalid JSON ({e})")
+                continue
+            yield line_number, row
+
+    def validate_row(self, row):
+        """
+        Normalise ``row`` in place and return an error message, if any.
+        """
+        username = (row.get("username") or "").strip()
+        email = (row.get("email") or "").strip()
+        if not username:
+            return "missing username"
+        try:
+            validate_email(email)
+        except ValidationError:
+            return f"invalid email {email!r}"
+        if email.lower() in self.emails:
+            return f"email {email} already exists"
+        if username in self.usernames:
+            return f"username {username} already exists"
+        if row.get("password_hash"):
+            try:
+                hashers.identify_hasher(row["password_hash"])
+            except ValueError:
+                return "unrecognised password_hash"
+
+        self.emails.add(email.lower())
+        self.usernames.add(username)
+        row["username"] = username
+        row["email"] = User.objects.normalize_email(email)
+        return None
+
+    def build_users(self, chunk, executor):
+        valid = []
+        for line_number, row in chunk:
+            error = self.validate_row(row)
+            if error:
+                self.stderr.write(f"line {line_number}: {error}")
+            else:
+                valid.append(row)
+
+        # Rows without any password get an unusable one.
+        raw_passwords = [
+            row.get("password") or None for row in valid if not row.get("password_hash")
+        ]
+        if executor is None:
+            hashes = map(hashers.make_password, raw_passwords)
+        else:
+            hashes = executor.map(
+                hashers.make_password,
+                raw_passwords,
+                chunksize=max(1, len(raw_passwords) // (4 * self.workers)),
+            )
+        hashes = iter(list(hashes))
+
+        return [
+            User(
+                password=row.get("password_hash") or next(hashes),
+                **{field: row.get(field) or "" for field in FIELDS},
+            )
+            for row in valid
+        ]
+
+    def insert(self, users):
+        """
+        Insert ``users`` with one ``bulk_create``, falling back to one row at a
+        time if a concurrent registration took one of the emails.
+        """
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+            return len(users)
+        except IntegrityError:
+            created = 0
+            for user in users:
+                try:
+                    with transaction.atomic():
+                        user.pk = None
+                        user.save(force_insert=True)
+                    created += 1
+                except IntegrityError:
+                    self.stderr.write(f"{user.email}: already exists")
+            return created
@@ -0,0 +1,262 @@
+import io
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.db.utils import load_backend
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from social_api.models import Friendship
+from social_api.parsers import FastJSONParser
+from social_api.renderers import FastJSONRenderer
+from social_api.serializers import (
+    FriendshipRequestReadSerializer,
+    FriendshipRequestSerializer,
+    UserReadSerializer,
+    UserSerializer,
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the rows/sec of the read fast paths with the DRF code they "
+        "replace, and requests/sec with and without persistent or pooled "
+        "database connections. Runs against a throwaway test database unless "
+        "--current-db is given."
+    )
+
+    subjects = ["serializers", "renderers", "connections"]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "subjects",
+            nargs="*",
+            help=f"Any of {', '.join(self.subjects)}; all by default.",
+        )
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Runs per case; the best is kept."
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument(
+            "--current-db",
+            action="store_true",
+            help="Seed and run against the configured database.",
+        )
+        parser.add_argument(
+            "--keepdb", action="store_true", help="Keep the test database."
+        )
+
+    def handle(self, *args, **options):
+        subjects = options["subjects"] or self.subjects
+        unknown = set(subjects) - set(self.subjects)
+        if unknown:
+            raise CommandError(f"Unknown subjects: {', '.join(sorted(unknown))}")
+        self.rows = options["rows"]
+        self.repeat = options["repeat"]
+
+        old_config = None
+        if not options["current_db"]:
+            setup_test_environment()
+            old_config = setup_databases(
+                verbosity=0, interactive=False, keepdb=options["keepdb"]
+            )
+        try:
+            self.seed()
+            report = {
+                subject: getattr(self, f"bench_{subject}")() for subject in subjects
+            }
+        finally:
+            if old_config is not None:
+                teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+                teardown_test_environment()
+
+        for subject, cases in report.items():
+            for case, result in cases.items():
+                self.stdout.write(
+                    f"{subject}.{case}: {result['baseline']:.0f} -> "
+                    f"{result['fast']:.0f} {result.get('unit', 'rows')}/sec "
+                    f"({result['speedup']}x)"
+                )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def seed(self):
+        """
+        Create ``rows`` users, each with a pending request to one receiver.
+        """
+        offset = User.objects.aggregate(last=Max("id"))["last"] or 0
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f"micro{offset + i}",
+                    email=f"micro{offset + i}@example.com",
+                    first_name="Micro",
+                )
+                for i in range(self.rows + 1)
+            ),
+            batch_size=1000,
+        )
+        self.users = User.objects.filter(pk__gt=offset).order_by("id")
+        receiver, *senders = self.users.only("id")
+        Friendship.objects.bulk_create(
+            (Friendship(from_user=sender, to_user=receiver) for sender in senders),
+            batch_size=1000,
+        )
+        self.requests = Friendship.objects.filter(
+            to_user=receiver, status="pending"
+        ).order_by("-created_at", "-id")
+        self.users = self.users[1:]
+
+    def measure(self, fn):
+        """
+        Return the best rows/sec of ``fn`` over ``repeat`` runs.
+        """
+        best = float("inf")
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        return self.rows / best
+
+    def compare(self, baseline, fast):
+        baseline, fast = self.measure(baseline), self.measure(fast)
+        return {
+            "baseline": round(baseline, 1),
+            "fast": round(fast, 1),
+            "speedup": round(fast / baseline, 2),
+        }
+
+    def bench_serializers(self):
+        """
+        Fetch and serialize the friend list and pending request pages with the
+        ``ModelSerializer`` path and with the ``.values()`` read serializers.
+        Each ``*_serialize`` case times serialization of already fetched rows.
+        """
+        users = self.users.only(*UserSerializer.Meta.fields)
+        user_rows = UserReadSerializer.values(self.users)
+        requests = self.requests.select_related("from_user")
+        request_rows = FriendshipRequestReadSerializer.values(self.requests)
+
+        users_list, user_rows_list = list(users), list(user_rows)
+        requests_list, request_rows_list = list(requests), list(request_rows)
+        return {
+            "users": self.compare(
+                lambda: UserSerializer(users.all(), many=True).data,
+                lambda: UserReadSerializer(user_rows.all(), many=True).data,
+            ),
+            "users_serialize": self.compare(
+                lambda: UserSerializer(users_list, many=True).data,
+                lambda: UserReadSerializer(user_rows_list, many=True).data,
+            ),
+            "friend_requests": self.compare(
+                lambda: FriendshipRequestSerializer(requests.all(), many=True).data,
+                lambda: FriendshipRequestReadSerializer(
+                    request_rows.all(), many=True
+                ).data,
+            ),
+            "friend_requests_serialize": self.compare(
+                lambda: FriendshipRequestSerializer(requests_list, many=True).data,
+                lambda: FriendshipRequestReadSerializer(
+                    request_rows_list, many=True
+                ).data,
+            ),
+        }
+
+    def bench_renderers(self):
+        """
+        Render the friend list and pending request payloads, and parse a
+        request body of the same size, with DRF's stdlib ``json`` classes and
+        with the orjson ones.
+        """
+        users = UserReadSerializer(
+            UserReadSerializer.values(self.users), many=True
+        ).data
+        requests = FriendshipRequestReadSerializer(
+            FriendshipRequestReadSerializer.values(self.requests), many=True
+        ).data
+        if FastJSONRenderer().render(requests) != JSONRenderer().render(requests):
+            raise CommandError("Renderers disagree on the pending request payload.")
+        body = JSONRenderer().render(requests)
+
+        return {
+            "users": self.compare(
+                lambda: JSONRenderer().render(users),
+                lambda: FastJSONRenderer().render(users),
+            ),
+            "friend_requests": self.compare(
+                lambda: JSONRenderer().render(requests),
+                lambda: FastJSONRenderer().render(requests),
+            ),
+            "parse_friend_requests": self.compare(
+                lambda: JSONParser().parse(io.BytesIO(body)),
+                lambda: FastJSONParser().parse(io.BytesIO(body)),
+            ),
+        }
+
+    def bench_connections(self):
+        """
+        Run ``rows`` requests of one query each, connecting and closing like
+        the request handler does, with ``CONN_MAX_AGE=0`` and with persistent
+        connections. On PostgreSQL the ``postgresql_pool`` backend is
+        compared too.
+        """
+        engines = {"persistent": (connection.settings_dict["ENGINE"], 60)}
+        if connection.vendor == "postgresql":
+            engines["pooled"] = ("social_api.postgresql_pool", 0)
+
+        report = {}
+        for case, (engine, max_age) in engines.items():
+            baseline = self.database_wrapper(connection.settings_dict["ENGINE"], 0)
+            fast = self.database_wrapper(engine, max_age)
+            try:
+                report[case] = {
+                    **self.compare(self.requests_on(baseline), self.requests_on(fast)),
+                    "unit": "requests",
+                }
+            finally:
+                baseline.close()
+                fast.close()
+                if case == "pooled":
+                    fast.pool.close_all()
+        return report
+
+    def database_wrapper(self, engine, max_age):
+        """
+        Open a separate connection to the benchmark database.
+        """
+        settings_dict = {
+            **connection.settings_dict,
+            "ENGINE": engine,
+            "CONN_MAX_AGE": max_age,
+            "POOL_SIZE": 1,
+        }
+        return load_backend(engine).DatabaseWrapper(
+            settings_dict, alias="microbenchmark"
+        )
+
+    def requests_on(self, wrapper):
+        def run():
+            for _ in range(self.rows):
+                # What close_old_connections() does on request_started and
+                # request_finished.
+                wrapper.close_if_unusable_or_obsolete()
+                with wrapper.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                wrapper.close_if_unusable_or_obsolete()
+
+        return run
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from social_api.graph import reconcile_counts
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the friend_count and pending_request_count of every user and "
+        "fix the ones that drifted from the friendship tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Users recounted per transaction.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drifted users without fixing them.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        drifted = []
+        last_pk = 0
+        while True:
+            batch = list(
+                User.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            with transaction.atomic():
+                drifted += reconcile_counts(
+                    User.objects.filter(pk__in=batch), dry_run=options["dry_run"]
+                )
+
+        verb = "Found" if options["dry_run"] else "Fixed"
+        self.stdout.write(f"{verb} {len(drifted)} users with drifted counts.")
+        if options["verbosity"] > 1 and drifted:
+            self.stdout.write(f"User ids: {', '.join(map(str, drifted))}")
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# The index expressions mirror the SQL Django emits for the ``icontains`` and
+# ``iexact`` lookups on PostgreSQL (``UPPER("col"::text)``) so the planner can
+# use them for the queries built by ``UserSearchFilter``.
+POSTGRES_INDEXES = {
+    "social_api_user_first_name_trgm": (
+        'USING gin ((UPPER("first_name"::text)) gin_trgm_ops)'
+    ),
+    "social_api_user_last_name_trgm": (
+        'USING gin ((UPPER("last_name"::text)) gin_trgm_ops)'
+    ),
+    "social_api_user_email_upper": '((UPPER("email"::text)))',
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, definition in POSTGRES_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" '
+            f'ON "social_api_user" {definition}'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in POSTGRES_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("social_api", "0002_friendship"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
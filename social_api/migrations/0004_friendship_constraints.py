@@ -0,0 +1,62 @@
+from django.db import migrations, models
+from django.db.models import Case, Count, When
+from django.db.models.functions import Greatest, Least
+
+
+def remove_duplicate_pairs(apps, schema_editor):
+    """
+    Keep one request per pair of users so the unique constraint can be added,
+    preferring an accepted request and then the oldest one.
+    """
+    Friendship = apps.get_model("social_api", "Friendship")
+    pairs = Friendship.objects.annotate(
+        low=Least("from_user", "to_user"), high=Greatest("from_user", "to_user")
+    )
+    duplicates = (
+        pairs.values("low", "high").annotate(total=Count("id")).filter(total__gt=1)
+    )
+    for pair in duplicates.iterator():
+        requests = pairs.filter(low=pair["low"], high=pair["high"]).order_by(
+            Case(When(status="accepted", then=0), default=1), "id"
+        )
+        keep = requests.values_list("id", flat=True)[0]
+        Friendship.objects.filter(
+            id__in=requests.exclude(id=keep).values("id")
+        ).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_api", "0003_user_search_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_pairs, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="friendship",
+            index=models.Index(
+                fields=["to_user", "status"], name="friendship_to_user_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="friendship",
+            index=models.Index(
+                fields=["from_user", "created_at"], name="friendship_from_created_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="friendship",
+            constraint=models.UniqueConstraint(
+                Least("from_user", "to_user"),
+                Greatest("from_user", "to_user"),
+                name="unique_friendship_pair",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="friendship",
+            constraint=models.CheckConstraint(
+                check=~models.Q(from_user=models.F("to_user")),
+                name="friendship_not_self",
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Upper
+
+
+def check_email_duplicates(apps, schema_editor):
+    """
+    Refuse to add the constraint while emails differ only in case. These are
+    separate accounts, so they are listed for a manual merge instead of being
+    deleted.
+    """
+    User = apps.get_model("social_api", "User")
+    duplicates = (
+        User.objects.values(upper_email=Upper("email"))
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+        .values_list("upper_email", flat=True)
+    )
+    emails = [
+        ", ".join(
+            User.objects.filter(email__iexact=email)
+            .order_by("id")
+            .values_list("email", flat=True)
+        )
+        for email in duplicates
+    ]
+    if emails:
+        raise RuntimeError(
+            "Cannot make user emails case-insensitively unique; merge or "
+            "rename the accounts sharing these emails first:\n" + "\n".join(emails)
+        )
+
+
+def drop_email_index(apps, schema_editor):
+    # Superseded by the unique index behind unique_user_email_ci.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute('DROP INDEX IF EXISTS "social_api_user_email_upper"')
+
+
+def create_email_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS "social_api_user_email_upper" '
+            'ON "social_api_user" ((UPPER("email"::text)))'
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_api", "0004_friendship_constraints"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_email_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                Upper("email"), name="unique_user_email_ci"
+            ),
+        ),
+        migrations.RunPython(drop_email_index, create_email_index),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_api", "0005_user_email_ci_unique"),
+    ]
+
+    operations = [
+        # The new index covers every query the old one served, so it is built
+        # before the old one is dropped.
+        migrations.AddIndex(
+            model_name="friendship",
+            index=models.Index(
+                fields=["to_user", "status", "created_at"],
+                name="friendship_to_status_time_idx",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="friendship",
+            name="friendship_to_user_status_idx",
+        ),
+    ]
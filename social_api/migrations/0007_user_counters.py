@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("*"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model("social_api", "User")
+    Friendship = apps.get_model("social_api", "Friendship")
+    User.objects.update(
+        friend_count=count_subquery(User.friends.through.objects.all(), "from_user"),
+        pending_request_count=count_subquery(
+            Friendship.objects.filter(status="pending"), "to_user"
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_api", "0006_friendship_pending_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="friend_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="pending_request_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_api", "0007_user_counters"),
+    ]
+
+    operations = [
+        # The new index covers every query the old one served, so it is built
+        # before the old one is dropped.
+        migrations.AddIndex(
+            model_name="friendship",
+            index=models.Index(
+                fields=["to_user", "status", "created_at", "id"],
+                name="friendship_to_status_key_idx",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="friendship",
+            name="friendship_to_status_time_idx",
+        ),
+    ]
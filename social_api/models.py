@@ -1,9 +1,28 @@
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Greatest, Least, Upper
 
 
-class UserManager(BaseUserManager):
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        Update the rows, then drop the cached token snapshots of the updated
+        users if a snapshotted column (e.g. ``is_active``) changed, as
+        ``post_save`` does for ``save()``.
+        """
+        # Imported here: authentication needs the user model to be loaded.
+        from .authentication import SNAPSHOT_FIELDS, token_cache
+
+        if not any(field in SNAPSHOT_FIELDS for field in kwargs):
+            return super().update(**kwargs)
+        user_ids = list(self.values_list("pk", flat=True))
+        rows = super().update(**kwargs)
+        token_cache.invalidate_users(*user_ids)
+        return rows
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     """
     Custom user manager for the User model.
     """
@@ -52,12 +71,22 @@ class User(AbstractUser):
 
     email = models.EmailField(unique=True)
     friends = models.ManyToManyField("self", blank=True)
+    # Denormalized counters, kept in step with F() updates where friendships
+    # and requests change; reconcile_counts repairs any drift.
+    friend_count = models.IntegerField(default=0)
+    pending_request_count = models.IntegerField(default=0)
 
     objects = UserManager()
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username"]
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Matches the UPPER("email"::text) Django emits for email__iexact.
+            models.UniqueConstraint(Upper("email"), name="unique_user_email_ci"),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -88,5 +117,30 @@ class Friendship(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # At most one request per pair of users, whatever its direction.
+            models.UniqueConstraint(
+                Least("from_user", "to_user"),
+                Greatest("from_user", "to_user"),
+                name="unique_friendship_pair",
+            ),
+            models.CheckConstraint(
+                check=~models.Q(from_user=models.F("to_user")),
+                name="friendship_not_self",
+            ),
+        ]
+        indexes = [
+            # Serves the newest-first pending list, ordered and paged on
+            # (created_at, id), without a sort.
+            models.Index(
+                fields=["to_user", "status", "created_at", "id"],
+                name="friendship_to_status_key_idx",
+            ),
+            models.Index(
+                fields=["from_user", "created_at"], name="friendship_from_created_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.from_user} -> {self.to_user}: {self.status}"
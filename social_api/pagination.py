@@ -0,0 +1,204 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import BooleanField, Expression, F, Q, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class RowComparison(Expression):
+    """
+    ``(a, b, ...) < (x, y, ...)`` (or ``>``): a row value comparison, which
+    the database matches against a composite index as a single range.
+    """
+
+    conditional = True
+    output_field = BooleanField()
+
+    def __init__(self, fields, operator, values):
+        super().__init__()
+        self.fields = [F(field) for field in fields]
+        self.operator = operator
+        self.values = values
+
+    def get_source_expressions(self):
+        return [*self.fields, *self.values]
+
+    def set_source_expressions(self, exprs):
+        self.fields = exprs[: len(self.fields)]
+        self.values = exprs[len(self.fields) :]
+
+    def as_sql(self, compiler, connection):
+        sides, params = [], []
+        for exprs in (self.fields, self.values):
+            sqls = []
+            for expr in exprs:
+                sql, expr_params = compiler.compile(expr)
+                sqls.append(sql)
+                params.extend(expr_params)
+            sides.append("(%s)" % ", ".join(sqls))
+        return "%s %s %s" % (sides[0], self.operator, sides[1]), params
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Opt-in keyset pagination.
+
+    Responses stay plain lists unless the client sends ``cursor`` or
+    ``page_size``. Pages are fetched with ``WHERE <key> > <cursor> LIMIT n``
+    on a unique (possibly composite), indexed key, so no ``COUNT(*)`` is run
+    and the cost of a page does not grow with its depth.
+    """
+
+    ordering = "id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def is_requested(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        return self.set_page(list(self.page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        ``paginate_queryset`` for async views: the same keyset query, fetched
+        with the async ORM.
+        """
+        if not self.is_requested(request):
+            return None
+        queryset = self.page_queryset(queryset, request, view)
+        return self.set_page([row async for row in queryset])
+
+    def page_queryset(self, queryset, request, view):
+        """
+        Return the rows of the requested page plus one, which tells whether
+        another page follows.
+
+        Unlike ``CursorPagination``, the cursor holds the value of every
+        ordering field, so an ordering made unique by a tie-breaker (e.g.
+        ``("-created_at", "-id")``) pages on the full key instead of falling
+        back to an offset among equal timestamps.
+        """
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self.position = (0, False, None)
+        else:
+            self.position = self.cursor
+        offset, reverse, current_position = self.position
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.after(queryset, ordering, current_position))
+        return queryset[offset : offset + self.page_size + 1]
+
+    def after(self, queryset, ordering, position):
+        """
+        Match the rows that follow ``position`` in ``ordering``:
+        ``(a, b, ...) > (x, y, ...)``, or ``a > x OR (a = x AND (b > y OR
+        ...))`` when the fields are sorted in different directions.
+        """
+        values = self.decode_position(queryset, ordering, position)
+        descending = {field.startswith("-") for field in ordering}
+        if len(ordering) > 1 and len(descending) == 1:
+            model_fields = [
+                queryset.model._meta.get_field(field.lstrip("-")) for field in ordering
+            ]
+            return RowComparison(
+                [field.name for field in model_fields],
+                "<" if descending.pop() else ">",
+                [
+                    Value(value, output_field=field)
+                    for field, value in zip(model_fields, values)
+                ],
+            )
+
+        condition = None
+        for field, value in reversed(list(zip(ordering, values))):
+            name = field.lstrip("-")
+            lookup = "__lt" if field.startswith("-") else "__gt"
+            following = Q(**{name + lookup: value})
+            if condition is not None:
+                following |= Q(**{name: value}) & condition
+            condition = following
+        return condition
+
+    def decode_position(self, queryset, ordering, position):
+        """
+        Return the values of ``position`` converted to the types of the
+        ordering fields, raising ``NotFound`` for a malformed cursor.
+        """
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise ValueError(position)
+            return [
+                queryset.model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(ordering, values)
+            ]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def set_page(self, results):
+        offset, reverse, current_position = self.position
+        self.page = results[: self.page_size]
+        has_following = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering)
+            if has_following
+            else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+        return self.page
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip("-")
+            value = (
+                instance[name]
+                if isinstance(instance, dict)
+                else getattr(instance, name)
+            )
+            values.append(str(value))
+        return json.dumps(values)
+
+
+class PendingRequestPagination(KeysetPagination):
+    """
+    Keyset pagination for pending friend requests, newest first.
+    """
+
+    ordering = ("-created_at", "-id")
+
+
+class MutualFriendsPagination(KeysetPagination):
+    """
+    Keyset pagination that is always applied, so one call returns at most
+    ``max_page_size`` users however many friends the two users share.
+    """
+
+    def is_requested(self, request):
+        return True
@@ -0,0 +1,29 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+UTF8 = {"utf-8", "utf8"}
+
+
+class FastJSONParser(JSONParser):
+    """
+    ``JSONParser`` backed by orjson when it is installed.
+
+    orjson only reads UTF-8 and never accepts ``NaN`` or ``Infinity``, so
+    other encodings and ``STRICT_JSON = False`` fall back to ``JSONParser``.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower() not in UTF8:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
@@ -0,0 +1,180 @@
+import contextlib
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool capping the database connections of one process.
+
+    At most ``max_size`` connections are open at once; a checkout beyond that
+    waits up to ``timeout`` seconds for a connection to be released and then
+    raises ``PoolTimeout``. Idle connections are reused newest first, so
+    surplus ones stay idle, and must pass ``check`` before being handed out.
+    """
+
+    def __init__(self, max_size, timeout, check=None, close=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check = check
+        self.close = close or (lambda connection: connection.close())
+        self.pid = os.getpid()
+        self._idle = []
+        self._size = 0
+        self._condition = threading.Condition()
+        self.reset_stats()
+
+    def acquire(self, connect):
+        """
+        Return an idle connection, or one opened with ``connect()`` if the pool
+        is not full.
+        """
+        while True:
+            connection = self._checkout()
+            if connection is None:
+                try:
+                    connection = connect()
+                except BaseException:
+                    self._forget()
+                    raise
+                with self._condition:
+                    self.created += 1
+                return connection
+            if self.check is None or self.check(connection):
+                return connection
+            self.release(connection, discard=True)
+
+    def release(self, connection, discard=False):
+        """
+        Return ``connection`` to the pool, or close it if ``discard``.
+        """
+        with self._condition:
+            if discard:
+                self._size -= 1
+                self.discarded += 1
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+        if discard:
+            self._close_quietly(connection)
+
+    def close_all(self):
+        """
+        Close the idle connections; checked out ones are closed on release.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection in idle:
+            self._close_quietly(connection)
+
+    def stats(self):
+        with self._condition:
+            checkouts = self.checkouts
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "checkouts": checkouts,
+                "created": self.created,
+                "discarded": self.discarded,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "wait_ratio": self.waits / checkouts if checkouts else 0.0,
+                "mean_wait_ms": (
+                    self.wait_time / self.waits * 1000 if self.waits else 0.0
+                ),
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+    def reset_stats(self):
+        with self._condition:
+            self.checkouts = self.created = self.discarded = 0
+            self.waits = self.timeouts = 0
+            self.wait_time = self.max_wait = 0.0
+
+    def _checkout(self):
+        """
+        Pop an idle connection, or reserve a slot for a new one and return
+        ``None``, waiting while the pool is full.
+        """
+        waiting_since = None
+        with self._condition:
+            try:
+                while not self._idle and self._size >= self.max_size:
+                    now = time.monotonic()
+                    if waiting_since is None:
+                        waiting_since = now
+                        self.waits += 1
+                    remaining = waiting_since + self.timeout - now
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f"No database connection was released within "
+                            f"{self.timeout}s; all {self.max_size} are in use."
+                        )
+                    self._condition.wait(remaining)
+            finally:
+                if waiting_since is not None:
+                    waited = time.monotonic() - waiting_since
+                    self.wait_time += waited
+                    self.max_wait = max(self.max_wait, waited)
+            self.checkouts += 1
+            if self._idle:
+                return self._idle.pop()
+            self._size += 1
+            return None
+
+    def _forget(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _close_quietly(self, connection):
+        with contextlib.suppress(Exception):
+            self.close(connection)
+
+
+# Pools of this process by database alias, see get_pool().
+pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, **kwargs):
+    """
+    Return the pool of database ``alias``, creating it with ``kwargs``.
+
+    Connections do not survive a fork, so a forked server worker starts with
+    new pools instead of using (or closing) its parent's connections.
+    """
+    pool = pools.get(alias)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pools_lock:
+        pool = pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            pool = pools[alias] = ConnectionPool(**kwargs)
+        return pool
+
+
+def pool_stats():
+    return {
+        alias: pool.stats() for alias, pool in pools.items() if pool.pid == os.getpid()
+    }
+
+
+def reset_pool_stats():
+    for pool in pools.values():
+        pool.reset_stats()
+
+
+def close_pools():
+    for pool in pools.values():
+        pool.close_all()
@@ -0,0 +1,67 @@
+"""
+PostgreSQL backend that draws its connections from a per-process
+``social_api.pool.ConnectionPool``.
+
+Set ``POOL_SIZE`` and ``POOL_TIMEOUT`` (seconds) in the database settings, and
+``CONN_MAX_AGE`` to 0 so every request returns its connection to the pool.
+With ``CONN_HEALTH_CHECKS`` an idle connection is pinged before reuse.
+"""
+
+from functools import partial
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from social_api.pool import PoolTimeout, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def pool(self):
+        return get_pool(
+            self.alias,
+            max_size=self.settings_dict.get("POOL_SIZE") or 10,
+            timeout=self.settings_dict.get("POOL_TIMEOUT", 5),
+            check=self.is_reusable
+            if self.settings_dict["CONN_HEALTH_CHECKS"]
+            else None,
+        )
+
+    def get_new_connection(self, conn_params):
+        try:
+            return self.pool.acquire(partial(super().get_new_connection, conn_params))
+        except PoolTimeout as e:
+            raise self.Database.OperationalError(str(e)) from e
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        reusable = not connection.closed
+        if (
+            reusable
+            and connection.get_transaction_status()
+            != extensions.TRANSACTION_STATUS_IDLE
+        ):
+            try:
+                connection.rollback()
+            except self.Database.Error:
+                reusable = False
+        self.pool.release(connection, discard=not reusable)
+
+    @staticmethod
+    def is_reusable(connection):
+        """
+        Ping an idle pooled connection, like ``is_usable()`` does for the
+        current one.
+        """
+        if connection.closed:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+        except base.Database.Error:
+            return False
+        return True
@@ -0,0 +1,75 @@
+import math
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` backed by orjson when it is installed.
+
+    The output is byte for byte what ``JSONRenderer`` produces with the
+    default ``UNICODE_JSON``/``COMPACT_JSON`` settings: date and time values
+    and everything orjson cannot encode natively (lazy strings, ``Decimal``,
+    querysets, ...) go through DRF's ``JSONEncoder.default``, and U+2028 and
+    U+2029 are escaped. Only floats that need an exponent are spelt
+    differently (``1e16`` rather than ``1e+16``). Indented output, other
+    settings, anything orjson rejects and NaN or infinite floats, which
+    orjson would render as ``null``, fall back to ``JSONRenderer``.
+    """
+
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+    default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits, or a genuinely unencodable
+            # value, which JSONRenderer reports with its usual error.
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Checked only when there is a null to explain, as most responses
+        # have none.
+        if b"null" in ret and has_non_finite_float(data):
+            # JSONRenderer raises ValueError, or writes NaN with STRICT_JSON
+            # off.
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
+
+
+def has_non_finite_float(data):
+    """
+    Return whether the lists, tuples and dicts of ``data`` hold a NaN or
+    infinite float.
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
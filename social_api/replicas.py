@@ -0,0 +1,96 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Whether reads in the current request may go to a replica, see
+# read_from_replica().
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def replica_aliases():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def pin_cache():
+    return caches[getattr(settings, "REPLICA_PIN_CACHE_ALIAS", "default")]
+
+
+def pin_key(user_id):
+    return f"replica_pin:{user_id}"
+
+
+def pin_to_primary(*user_ids):
+    """
+    Read the data of ``user_ids`` from the primary for the next
+    ``REPLICA_PIN_SECONDS``, so they see their own writes even while the
+    replicas lag behind.
+    """
+    if not replica_aliases() or not user_ids:
+        return
+    pin_cache().set_many(
+        {pin_key(user_id): True for user_id in user_ids},
+        getattr(settings, "REPLICA_PIN_SECONDS", 10),
+    )
+
+
+def use_replica(user):
+    """
+    Return whether the reads of ``user`` may be served by a replica.
+    """
+    if not replica_aliases():
+        return False
+    return not (user.is_authenticated and pin_cache().get(pin_key(user.pk)))
+
+
+async def ause_replica(user):
+    if not replica_aliases():
+        return False
+    return not (user.is_authenticated and await pin_cache().aget(pin_key(user.pk)))
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    """
+    Send the reads of the block to a replica if ``enabled``.
+    """
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Route reads to a random alias of ``DATABASE_REPLICAS`` inside
+    ``read_from_replica()`` blocks, and all other reads and every write to
+    ``default``.
+
+    Replicas are only used where a view opts in, so reads within a write
+    (e.g. checks before an update) never see stale rows.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if replicas and _replica_reads.get():
+            return random.choice(replicas)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        # Also for instances that were read from a replica.
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema from the primary.
+        if db in replica_aliases():
+            return False
+        return None
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import django
+import drf_spectacular
+import rest_framework
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import URLResolver, get_resolver
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+
+def source_fingerprint():
+    """
+    Hash the Python source of the project's apps, the resolved URL patterns,
+    the DRF and drf-spectacular settings, and the Django, DRF and
+    drf-spectacular versions, i.e. everything the schema depends on.
+
+    The URL patterns and settings are included because they vary with the
+    environment (e.g. ``ASYNC_READ_VIEWS``) for the same source, and
+    processes with different ones may share ``SCHEMA_CACHE_FILE``.
+    """
+    base_dir = Path(settings.BASE_DIR).resolve()
+    roots = {Path(app.path).resolve() for app in apps.get_app_configs()}
+    roots.add(base_dir / settings.ROOT_URLCONF.split(".")[0])
+    digest = hashlib.sha256()
+    for package in (django, rest_framework, drf_spectacular):
+        digest.update(package.__version__.encode())
+    for root in sorted(root for root in roots if root.is_relative_to(base_dir)):
+        for path in sorted(root.rglob("*.py")):
+            digest.update(str(path.relative_to(base_dir)).encode())
+            digest.update(path.read_bytes())
+    resolver = get_resolver(spectacular_settings.SERVE_URLCONF)
+    for route in url_routes(resolver.url_patterns):
+        digest.update(route.encode())
+    digest.update(
+        json.dumps(
+            [
+                getattr(settings, "REST_FRAMEWORK", {}),
+                getattr(settings, "SPECTACULAR_SETTINGS", {}),
+            ],
+            sort_keys=True,
+            default=repr,
+        ).encode()
+    )
+    return digest.hexdigest()
+
+
+def url_routes(patterns, prefix=""):
+    """
+    Yield ``"<route> <view>"`` for every pattern under ``patterns``.
+    """
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from url_routes(pattern.url_patterns, prefix + str(pattern.pattern))
+            continue
+        callback = pattern.callback
+        view = getattr(callback, "cls", None) or getattr(
+            callback, "view_class", callback
+        )
+        actions = getattr(callback, "actions", None) or {}
+        yield (
+            f"{prefix}{pattern.pattern} {view.__module__}.{view.__qualname__} "
+            f"{sorted(actions.items())}"
+        )
+
+
+class SchemaCache:
+    """
+    Rendered OpenAPI documents, kept in memory and in ``SCHEMA_CACHE_FILE``.
+
+    Documents are keyed by API version, language and media type and carry an
+    ETag. The file is tagged with ``source_fingerprint()`` and ignored once
+    the code, URL patterns or API settings change, so the schema is only generated again after a deploy
+    (or by the ``generate_schema`` command). Without ``SCHEMA_CACHE_FILE``
+    documents are only cached in memory.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._schemas = {}
+        self._documents = None
+        self._fingerprint = None
+
+    @property
+    def path(self):
+        path = self._path or getattr(settings, "SCHEMA_CACHE_FILE", None)
+        return Path(path) if path else None
+
+    def get(self, version, media_type, renderer, generate):
+        """
+        Return ``(content, etag)`` of the schema for ``version`` in the active
+        language rendered by ``renderer``, calling ``generate()`` for the
+        schema itself at most once per version and language.
+        """
+        language = translation.get_language()
+        key = f"{version or ''}|{language}|{media_type}"
+        with self._lock:
+            documents = self._load()
+            if key not in documents:
+                schema = self._schemas.get((version, language))
+                if schema is None:
+                    schema = self._schemas[version, language] = generate()
+                content = renderer.render(schema, media_type, {})
+                etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+                documents[key] = (content, etag)
+                self._save(documents)
+            return documents[key]
+
+    def clear(self):
+        with self._lock:
+            self._schemas.clear()
+            self._documents = None
+            self._fingerprint = None
+            if self.path:
+                self.path.unlink(missing_ok=True)
+
+    def _load(self):
+        if self._documents is not None:
+            return self._documents
+        self._fingerprint = source_fingerprint()
+        self._documents = {}
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except (TypeError, OSError, ValueError):
+            return self._documents
+        if stored.get("fingerprint") == self._fingerprint:
+            self._documents = {
+                key: (entry["content"].encode(), entry["etag"])
+                for key, entry in stored["documents"].items()
+            }
+        return self._documents
+
+    def _save(self, documents):
+        if not self.path:
+            return
+        stored = {
+            "fingerprint": self._fingerprint,
+            "documents": {
+                key: {"content": content.decode(), "etag": etag}
+                for key, (content, etag) in documents.items()
+            },
+        }
+        # Write a sibling file and rename it so readers never see a partial
+        # file, even with several workers sharing it.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temporary, "w") as f:
+                json.dump(stored, f)
+            os.replace(temporary, self.path)
+        except OSError:
+            temporary.unlink(missing_ok=True)
+
+
+schema_cache = SchemaCache()
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    ``SpectacularAPIView`` serving documents from ``schema_cache``.
+
+    Responses carry an ``ETag`` and ``If-None-Match`` gets a 304. The
+    Swagger and Redoc pages load their schema from this view.
+    """
+
+    def _get_schema_response(self, request):
+        version = (
+            self.api_version or request.version or self._get_version_parameter(request)
+        )
+        content, etag = schema_cache.get(
+            version,
+            request.accepted_media_type,
+            request.accepted_renderer,
+            lambda: self.generator_class(
+                urlconf=self.urlconf, api_version=version, patterns=self.patterns
+            ).get_schema(request=None, public=self.serve_public),
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            filename = self._get_filename(request, version)
+            response = HttpResponse(
+                content,
+                content_type=self.content_type(request),
+                headers={"Content-Disposition": f'inline; filename="{filename}"'},
+            )
+        response["ETag"] = etag
+        return response
+
+    @staticmethod
+    def content_type(request):
+        renderer = request.accepted_renderer
+        if renderer.charset:
+            return f"{request.accepted_media_type}; charset={renderer.charset}"
+        return request.accepted_media_type
+
+
+def generate_schema_documents():
+    """
+    Fill ``schema_cache`` with the default schema in every format served by
+    ``CachedSpectacularAPIView``.
+    """
+    view = CachedSpectacularAPIView()
+
+    def generate():
+        generator = view.generator_class(urlconf=spectacular_settings.SERVE_URLCONF)
+        return generator.get_schema(request=None, public=view.serve_public)
+
+    for renderer_class in view.renderer_classes:
+        renderer = renderer_class()
+        schema_cache.get(None, renderer.media_type, renderer, generate)
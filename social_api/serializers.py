@@ -1,11 +1,12 @@
-from datetime import timedelta
-
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
-from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from rest_framework import serializers
-from rest_framework.validators import UniqueValidator
 
+from .cache import friend_cache
+from .graph import adjust_counts
+from .hashing import password_hash_pool
 from .models import Friendship
 
 User = get_user_model()
@@ -16,9 +17,7 @@ class RegisterSerializer(serializers.ModelSerializer):
     Serializer for user registration.
     """
 
-    email = serializers.EmailField(
-        required=True, validators=[UniqueValidator(queryset=User.objects.all())]
-    )
+    email = serializers.EmailField(required=True)
     password = serializers.CharField(
         write_only=True, required=True, validators=[validate_password]
     )
@@ -48,22 +47,34 @@ class RegisterSerializer(serializers.ModelSerializer):
         return attrs
 
     def validate_email(self, email):
-        user = User.objects.filter(email__iexact=email)
-        if user:
+        # Served by the unique_user_email_ci index, which also catches races.
+        if User.objects.filter(email__iexact=email).exists():
             raise serializers.ValidationError("User already exists")
 
         return email
 
     def create(self, validated_data):
-        user = User.objects.create(
+        user = User(
             username=validated_data["username"],
             email=validated_data["email"],
             first_name=validated_data["first_name"],
             last_name=validated_data["last_name"],
+            password=password_hash_pool.make_password(validated_data["password"]),
         )
 
-        user.set_password(validated_data["password"])
-        user.save()
+        try:
+            with transaction.atomic():
+                user.save(force_insert=True)
+        except IntegrityError:
+            # A concurrent registration took the username or email.
+            if User.objects.filter(username=user.username).exists():
+                raise serializers.ValidationError(
+                    {"username": ["A user with that username already exists."]}
+                )
+            if User.objects.filter(email__iexact=user.email).exists():
+                raise serializers.ValidationError({"email": ["User already exists"]})
+            # Not a duplicate, e.g. a value too long for its column.
+            raise
 
         return user
 
@@ -80,18 +91,20 @@ class UserLoginSerializer(serializers.Serializer):
         email = validated_data.get("email")
         password = validated_data.get("password")
 
-        user = User.objects.filter(email__iexact=email)
-        if not user:
+        # One query fetches the user and, if it exists, their token.
+        user = (
+            User.objects.filter(email__iexact=email)
+            .select_related("auth_token")
+            .first()
+        )
+        if user is None:
             raise serializers.ValidationError("Invalid email or password.")
-        email = user[0].email
-        user = authenticate(email=email, password=password)
 
-        if not user:
+        # Inactive users are reported like bad credentials, as authenticate()
+        # did, and never reach the hashing pool.
+        if not user.is_active or not password_hash_pool.check_password(password, user):
             raise serializers.ValidationError("Invalid email or password.")
 
-        if not user.is_active:
-            raise serializers.ValidationError("This user account is inactive.")
-
         validated_data["user"] = user
         return validated_data
 
@@ -106,6 +119,30 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "email", "first_name"]
 
 
+class UserSummarySerializer(UserSerializer):
+    """
+    Serializer for the current user with their friend and pending request
+    counts.
+    """
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + [
+            "friend_count",
+            "pending_request_count",
+        ]
+
+
+class FriendSuggestionSerializer(UserSerializer):
+    """
+    Serializer for friend suggestions with their mutual friend count.
+    """
+
+    mutual_friends = serializers.IntegerField(read_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ["mutual_friends"]
+
+
 class FriendshipRequestSerializer(serializers.ModelSerializer):
     """
     Serializer for friendship requests.
@@ -124,24 +161,8 @@ class FriendshipRequestSerializer(serializers.ModelSerializer):
         to_user = validate_data["to_user"]
         from_user = self.context.get("request").user
 
-        if Friendship.objects.filter(from_user=from_user, to_user=to_user).exists():
-            raise serializers.ValidationError(
-                {"request": "Friendship request already exists."}
-            )
-
-        if Friendship.objects.filter(from_user=to_user, to_user=from_user).exists():
-            raise serializers.ValidationError(
-                {"request": "Friendship request already received"}
-            )
-        one_minute_ago = timezone.now() - timedelta(minutes=1)
-        latest_objs = Friendship.objects.filter(
-            from_user=from_user, created_at__gt=one_minute_ago
-        ).order_by("-created_at")
-
-        if len(latest_objs) > 2:
-            raise serializers.ValidationError(
-                {"request": "Exceeded the limit of sending friend requests."}
-            )
+        if friend_cache.are_friends(from_user.id, to_user.id):
+            raise serializers.ValidationError({"request": "Already friends."})
 
         return validate_data
 
@@ -154,18 +175,103 @@ class FriendshipRequestSerializer(serializers.ModelSerializer):
                 {"request": "User can't send request to self"}
             )
 
-        friendship_request = Friendship(from_user=from_user, to_user=to_user)
-        friendship_request.save()
-        return friendship_request
+        # The unique_friendship_pair constraint rejects duplicates in either
+        # direction, so the common case is a single INSERT.
+        try:
+            with transaction.atomic():
+                friendship_request = Friendship.objects.create(
+                    from_user=from_user, to_user=to_user
+                )
+                adjust_counts("pending_request_count", {to_user.pk: 1})
+                return friendship_request
+        except IntegrityError:
+            sender_id = (
+                Friendship.objects.filter(
+                    Q(from_user=from_user, to_user=to_user)
+                    | Q(from_user=to_user, to_user=from_user)
+                )
+                .values_list("from_user", flat=True)
+                .first()
+            )
+            if sender_id is None:
+                # Not a duplicate, e.g. to_user was deleted concurrently.
+                raise
+            if sender_id == from_user.pk:
+                raise serializers.ValidationError(
+                    {"request": ["Friendship request already exists."]}
+                )
+            raise serializers.ValidationError(
+                {"request": ["Friendship request already received"]}
+            )
+
+
+class BulkFriendshipRequestSerializer(serializers.Serializer):
+    """
+    Serializer for sending friend requests to several users at once.
+    """
+
+    to_users = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=100
+    )
 
 
-class UserfriendSerializer(serializers.ModelSerializer):
+class FriendshipRequestIdsSerializer(serializers.Serializer):
     """
-    Serializer for user's friends.
+    Serializer for responding to several friendship requests at once.
     """
 
-    friends = UserSerializer(many=True)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=100
+    )
 
-    class Meta:
-        model = User
-        fields = ["friends"]
+
+class UserReadSerializer(serializers.BaseSerializer):
+    """
+    Read-only ``UserSerializer`` for rows from ``.values()``.
+
+    Each row becomes a dict directly instead of going through a model instance
+    and DRF's per-field ``to_representation``; the output is identical.
+    """
+
+    value_fields = tuple(UserSerializer.Meta.fields)
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.value_fields)
+
+    def to_representation(self, row):
+        return {
+            "id": row["id"],
+            "username": row["username"],
+            "email": row["email"],
+            "first_name": row["first_name"],
+        }
+
+
+class FriendshipRequestReadSerializer(serializers.BaseSerializer):
+    """
+    Read-only ``FriendshipRequestSerializer`` for rows from ``.values()``,
+    with the sender's columns fetched through the same join.
+    """
+
+    # created_at is only read by the keyset paginator.
+    value_fields = ("id", "to_user", "status", "created_at") + tuple(
+        f"from_user__{field}" for field in UserSerializer.Meta.fields
+    )
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.value_fields)
+
+    def to_representation(self, row):
+        return {
+            "id": row["id"],
+            "from_user": {
+                "id": row["from_user__id"],
+                "username": row["from_user__username"],
+                "email": row["from_user__email"],
+                "first_name": row["from_user__first_name"],
+            },
+            "to_user": row["to_user"],
+            "status": row["status"],
+        }
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .cache import friend_cache
+from .graph import adjust_counts
+
+User = get_user_model()
+
+
+@receiver(m2m_changed, sender=User.friends.through)
+def sync_friend_cache(sender, instance, action, pk_set, **kwargs):
+    """
+    Keep the friend id cache in step with changes to ``User.friends``.
+    """
+    if action == "post_add":
+        for friend_id in pk_set:
+            transaction.on_commit(
+                lambda friend_id=friend_id: friend_cache.add_edge(
+                    instance.pk, friend_id
+                )
+            )
+    elif action == "post_remove":
+        user_ids = [instance.pk, *pk_set]
+        transaction.on_commit(lambda: friend_cache.invalidate(*user_ids))
+    elif action == "pre_clear":
+        user_ids = [instance.pk, *instance.friends.values_list("pk", flat=True)]
+        transaction.on_commit(lambda: friend_cache.invalidate(*user_ids))
+
+
+@receiver(m2m_changed, sender=User.friends.through)
+def sync_friend_counts(sender, instance, action, pk_set, **kwargs):
+    """
+    Keep ``friend_count`` in step with changes to ``User.friends``.
+    """
+    if action == "post_add":
+        # Only the ids that were not friends yet.
+        friend_ids = pk_set
+        delta = 1
+    elif action == "pre_remove":
+        # pk_set may name users that are not friends. The edges that exist are
+        # locked, so a concurrent removal waits and then finds them gone.
+        friend_ids = set(
+            sender.objects.select_for_update()
+            .filter(from_user=instance, to_user__in=pk_set)
+            .values_list("to_user", flat=True)
+        )
+        delta = -1
+    elif action == "pre_clear":
+        friend_ids = set(instance.friends.values_list("pk", flat=True))
+        delta = -1
+    else:
+        return
+    if friend_ids:
+        adjust_counts(
+            "friend_count",
+            {**dict.fromkeys(friend_ids, delta), instance.pk: delta * len(friend_ids)},
+        )
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """
+    Drop the cached snapshot of a deleted token.
+    """
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, update_fields, **kwargs):
+    """
+    Drop cached snapshots when a user changes, e.g. is deactivated.
+    """
+    if created or update_fields == frozenset({"last_login"}):
+        return
+    token_cache.invalidate_users(instance.pk)
@@ -1,13 +1,74 @@
+import io
+import json
+import os
+import runpy
+import subprocess
+import sys
+import threading
+import uuid
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from types import ModuleType
+from urllib.parse import urlencode
+
 import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings as django_settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, router
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils.translation import gettext_lazy
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiYamlRenderer
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework import serializers
 from rest_framework.authtoken.models import Token
-from rest_framework.test import APIClient
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
 
-from .serializers import RegisterSerializer
+from . import parsers, renderers, schema
+from .authentication import token_cache
+from .cache import FriendCache, friend_cache
+from .graph import add_friend_edges, friend_suggestions
+from .hashing import password_hash_pool
+from .instrumentation import RequestMetrics, query_stats
+from .models import Friendship
+from .parsers import FastJSONParser
+from .pool import ConnectionPool, PoolTimeout
+from .renderers import FastJSONRenderer
+from .replicas import read_from_replica, use_replica
+from .schema import SchemaCache, schema_cache
+from .serializers import (
+    FriendshipRequestReadSerializer,
+    FriendshipRequestSerializer,
+    RegisterSerializer,
+    UserReadSerializer,
+    UserSerializer,
+)
+from .throttling import MemoryBackend, SlidingWindowRateLimiter
+from .urls import async_read_urlpatterns, sync_read_urlpatterns
 
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Fixture for resetting caches, since ids are reused between tests.
+    """
+    yield
+    friend_cache.clear()
+    cache.clear()
+
+
 @pytest.fixture(scope="class")
 def api_client():
     """
@@ -110,6 +171,58 @@ class TestUserSignupLogin:
         response = api_client.post("/register/", data=register_data)
         assert response.status_code == 400
 
+    def test_register_api_case_insensitive_email(
+        self, api_client, register_data, register_user
+    ):
+        """
+        Test case for registering an email that differs only in case.
+        """
+        register_data.update(username="other", email="TEST@Example.com")
+        response = api_client.post("/register/", data=register_data)
+        assert response.status_code == 400
+        assert response.json() == {"email": ["User already exists"]}
+
+    def test_register_query_count(
+        self, api_client, register_data, django_assert_num_queries
+    ):
+        """
+        Test case for registering with one uniqueness check per field and
+        a single insert.
+        """
+        # Username and email checks, then the INSERT wrapped in a savepoint.
+        with django_assert_num_queries(5):
+            response = api_client.post("/register/", data=register_data)
+        assert response.status_code == 201
+
+    def test_register_serializer_race(self, register_data, register_user):
+        """
+        Test case for a registration losing a race on the email constraint.
+        """
+        register_data.update(username="other", email="fresh@example.com")
+        register_serializer = RegisterSerializer(data=register_data)
+        assert register_serializer.is_valid()
+        # Another request registers the email after validation passed.
+        register_serializer.validated_data["email"] = "TEST@example.com"
+        with pytest.raises(serializers.ValidationError) as excinfo:
+            register_serializer.save()
+        assert excinfo.value.detail == {"email": ["User already exists"]}
+
+    def test_register_serializer_other_integrity_error(
+        self, register_data, monkeypatch
+    ):
+        """
+        Test case for not reporting other constraint failures as duplicates.
+        """
+
+        def save(self, **kwargs):
+            raise IntegrityError("CHECK constraint failed")
+
+        register_serializer = RegisterSerializer(data=register_data)
+        assert register_serializer.is_valid()
+        monkeypatch.setattr(User, "save", save)
+        with pytest.raises(IntegrityError):
+            register_serializer.save()
+
     def test_register_serializer_create(self, register_data):
         """
         Test case for registering a user using the serializer.
@@ -147,6 +260,25 @@ class TestUserSignupLogin:
         if code == 200:
             assert response.json()["token"]
 
+    def test_login_query_count(
+        self,
+        api_client,
+        register_user,
+        django_assert_num_queries,
+        django_assert_max_num_queries,
+    ):
+        """
+        Test case for logging in with a single query once a token exists.
+        """
+        data = {"email": "TEST@example.com", "password": "testpassword"}
+        # User and token lookup, then the token insert wrapped in a savepoint.
+        with django_assert_max_num_queries(4):
+            first = api_client.post("/login/", data=data)
+        with django_assert_num_queries(1):
+            second = api_client.post("/login/", data=data)
+        assert second.status_code == 200
+        assert second.json()["token"] == first.json()["token"]
+
 
 @pytest.mark.django_db
 class TestUserSearchApi:
@@ -167,6 +299,7 @@ class TestUserSearchApi:
         [
             ("Joh", 2),  # search with username
             ("test@example.com", 1),  # search with email
+            ("TEST@example.com", 1),  # email match is case insensitive
             ("te@example.com", 0),  # expect 0 because exact match with email
         ],
     )
@@ -181,6 +314,41 @@ class TestUserSearchApi:
         results = response.json()
         assert len(results) == expected_results
 
+    @pytest.mark.skipif(
+        connection.vendor != "postgresql", reason="trigram ranking needs PostgreSQL"
+    )
+    def test_search_ranking(self, auth_client, register_user):
+        """
+        Test case for ranking closer name matches first.
+        """
+        User.objects.filter(pk=register_user.pk).update(first_name="Johnathan")
+        for name in ("Johnny", "John"):
+            User.objects.create_user(
+                email=f"{name.lower()}@example.com", username=name, first_name=name
+            )
+        response = auth_client.get("/search_user/", {"search": "John"})
+        assert [user["first_name"] for user in response.json()] == [
+            "John",
+            "Johnny",
+            "Johnathan",
+        ]
+
+    def test_search_api_cursor_pagination(self, auth_client, client_second):
+        """
+        Test case for paging through search results with a cursor.
+        """
+        response = auth_client.get("/search_user/", {"page_size": 1})
+        assert response.status_code == 200
+        first_page = response.json()
+        assert len(first_page["results"]) == 1
+        assert first_page["next"]
+
+        response = auth_client.get(first_page["next"])
+        second_page = response.json()
+        assert len(second_page["results"]) == 1
+        assert second_page["next"] is None
+        assert second_page["results"][0]["id"] > first_page["results"][0]["id"]
+
 
 @pytest.mark.django_db
 class TestFriendRequestAPI:
@@ -196,6 +364,44 @@ class TestFriendRequestAPI:
         result = send_request_to_auth_client.json()
         assert result
 
+    def test_send_duplicate_request(self, send_request_to_auth_client, client_second):
+        """
+        Test case for sending the same friend request twice.
+        """
+        user = User.objects.get(email=client_second["email"])
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(
+            "/friend_request/", data={"to_user": User.objects.first().id}
+        )
+        assert response.status_code == 400
+        assert response.json() == {"request": ["Friendship request already exists."]}
+
+    def test_send_reverse_request(self, send_request_to_auth_client, auth_client):
+        """
+        Test case for sending a request to a user who already sent one.
+        """
+        sender = User.objects.get(username="test_super")
+        response = auth_client.post("/friend_request/", data={"to_user": sender.id})
+        assert response.status_code == 400
+        assert response.json() == {"request": ["Friendship request already received"]}
+        assert Friendship.objects.count() == 1
+
+    def test_send_request_other_integrity_error(
+        self, auth_client, client_second, monkeypatch
+    ):
+        """
+        Test case for not reporting other constraint failures as duplicates.
+        """
+
+        def create(**kwargs):
+            raise IntegrityError("FOREIGN KEY constraint failed")
+
+        to_user = User.objects.get(email=client_second["email"])
+        monkeypatch.setattr(Friendship.objects, "create", create)
+        with pytest.raises(IntegrityError):
+            auth_client.post("/friend_request/", data={"to_user": to_user.id})
+
     def test_pending_list(self, send_request_to_auth_client, auth_client):
         """
         Test case for retrieving the pending friend requests list.
@@ -206,6 +412,92 @@ class TestFriendRequestAPI:
         assert len(result) == 1
         assert result[0]["from_user"]["username"] == "test_super"
 
+    def test_pending_list_cursor_pagination(
+        self, send_request_to_auth_client, auth_client
+    ):
+        """
+        Test case for retrieving pending friend requests one page at a time.
+        """
+        response = auth_client.get("/friend_request/", {"page_size": 10})
+        assert response.status_code == 200
+        result = response.json()
+        assert result["next"] is None
+        assert len(result["results"]) == 1
+        assert result["results"][0]["from_user"]["username"] == "test_super"
+
+    @pytest.mark.parametrize(
+        "url, position",
+        [
+            ("/search_user/", ["abc"]),
+            ("/friend_request/", ["abc", "1"]),
+            ("/friend_request/", ["2023-06-01 00:00:00+00:00", "abc"]),
+            ("/friend_request/", "abc"),
+        ],
+    )
+    def test_tampered_cursor(self, auth_client, url, position):
+        """
+        Test case for rejecting cursors with malformed positions.
+        """
+        cursor = b64encode(
+            urlencode({"p": json.dumps(position)}).encode("ascii")
+        ).decode("ascii")
+        response = auth_client.get(url, {"cursor": cursor})
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Invalid cursor"}
+
+    def test_pending_list_cursor_ties(self, auth_client, register_user):
+        """
+        Test case for paging through requests sent at the same time.
+        """
+        User.objects.bulk_create(
+            User(username=f"sender{i}", email=f"sender{i}@example.com")
+            for i in range(5)
+        )
+        Friendship.objects.bulk_create(
+            Friendship(from_user=sender, to_user=register_user)
+            for sender in User.objects.filter(username__startswith="sender")
+        )
+        Friendship.objects.update(created_at=Friendship.objects.first().created_at)
+
+        ids, url = [], "/friend_request/?page_size=2"
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = auth_client.get(url)
+            assert "OFFSET" not in queries[-1]["sql"]
+            if ids:
+                assert '"created_at", "social_api_friendship"."id") < (' in (
+                    queries[-1]["sql"]
+                )
+            result = response.json()
+            ids += [item["id"] for item in result["results"]]
+            url = result["next"]
+        expected = Friendship.objects.order_by("-id").values_list("id", flat=True)
+        assert ids == list(expected)
+
+    @pytest.mark.parametrize("senders", [1, 25])
+    def test_pending_list_constant_queries(
+        self, auth_client, register_user, senders, django_assert_num_queries
+    ):
+        """
+        Test case for listing pending requests in one query, newest first.
+        """
+        User.objects.bulk_create(
+            User(username=f"sender{i}", email=f"sender{i}@example.com")
+            for i in range(senders)
+        )
+        for sender in User.objects.filter(username__startswith="sender"):
+            Friendship.objects.create(from_user=sender, to_user=register_user)
+        auth_client.get("/friend_request/")  # caches the token
+
+        with django_assert_num_queries(1):
+            response = auth_client.get("/friend_request/")
+        usernames = [item["from_user"]["username"] for item in response.json()]
+        assert usernames == [f"sender{i}" for i in reversed(range(senders))]
+
+        with django_assert_num_queries(1):
+            response = auth_client.get("/friend_request/", {"page_size": 10})
+        assert len(response.json()["results"]) == min(senders, 10)
+
     def test_accept_request(self, send_request_to_auth_client, auth_client):
         """
         Test case for accepting a friend request.
@@ -243,7 +535,1376 @@ class TestFriendListAPI:
         id = request["id"]
         auth_client.put(f"/friend_request/{id}/accept_request/")
         response = auth_client.get("/user_friend_list/")
-        result = response.json()
-        friends = result[0]["friends"]
+        friends = response.json()
         assert len(friends) == 1
         assert friends[0]["username"] == "test_super"
+
+    def test_friend_list_single_query(
+        self, send_request_to_auth_client, auth_client, django_assert_num_queries
+    ):
+        """
+        Test case for listing friends in one query after authentication.
+        """
+        request = send_request_to_auth_client.json()
+        auth_client.put(f"/friend_request/{request['id']}/accept_request/")
+        # The token is already cached, so only the friends page is fetched.
+        with django_assert_num_queries(1):
+            response = auth_client.get("/user_friend_list/", {"page_size": 10})
+        result = response.json()
+        assert result["next"] is None
+        assert [friend["username"] for friend in result["results"]] == ["test_super"]
+
+
+@pytest.fixture
+@pytest.mark.django_db
+def friend_graph(register_user):
+    """
+    Fixture for building a small friend graph around the registered user.
+
+    ``testuser`` is friends with ``alice`` and ``bob``, who are both friends
+    with ``carol``. ``dave`` is only friends with ``alice``.
+    """
+    users = {
+        name: User.objects.create_user(
+            email=f"{name}@example.com", password="testpassword", username=name
+        )
+        for name in ("alice", "bob", "carol", "dave")
+    }
+    register_user.friends.add(users["alice"], users["bob"])
+    users["carol"].friends.add(users["alice"], users["bob"])
+    users["dave"].friends.add(users["alice"])
+    return users
+
+
+@pytest.mark.django_db
+class TestFriendGraphAPI:
+    """
+    Test class for mutual friends and friend suggestion APIs.
+    """
+
+    def test_mutual_friends(self, auth_client, friend_graph):
+        """
+        Test case for listing friends shared with another user.
+        """
+        url = f"/mutual_friends/{friend_graph['carol'].id}/"
+        response = auth_client.get(url)
+        assert response.status_code == 200
+        usernames = [user["username"] for user in response.json()["results"]]
+        assert usernames == ["alice", "bob"]
+
+        response = auth_client.get(url, {"page_size": 1})
+        result = response.json()
+        assert [user["username"] for user in result["results"]] == ["alice"]
+        response = auth_client.get(result["next"])
+        assert [user["username"] for user in response.json()["results"]] == ["bob"]
+
+    def test_friend_suggestions(self, auth_client, friend_graph):
+        """
+        Test case for ranking friends of friends by mutual friend count.
+        """
+        response = auth_client.get("/friend_suggestions/")
+        assert response.status_code == 200
+        result = response.json()
+        assert [(user["username"], user["mutual_friends"]) for user in result] == [
+            ("carol", 2),
+            ("dave", 1),
+        ]
+
+    def test_friend_suggestions_per_friend_cap(self, register_user, friend_graph):
+        """
+        Test case for reading only the first friends of each expanded friend.
+        """
+        alice, bob = friend_graph["alice"], friend_graph["bob"]
+        # alice's friends by id: testuser, carol, dave; bob's: testuser, carol.
+        suggestions = friend_suggestions(register_user.id, per_friend=2)
+        assert [(user.username, user.mutual_friends) for user in suggestions] == [
+            ("carol", 2)
+        ]
+        assert friend_suggestions(alice.id, per_friend=1) == []
+        assert [user.username for user in friend_suggestions(bob.id)] == ["alice"]
+
+
+@pytest.mark.django_db
+class TestFriendCache:
+    """
+    Test class for the friend id cache.
+    """
+
+    def test_lazy_load(self, register_user, friend_graph, django_assert_num_queries):
+        """
+        Test case for loading a friend set once and serving it from cache.
+        """
+        alice = friend_graph["alice"]
+        with django_assert_num_queries(1):
+            assert friend_cache.are_friends(alice.id, register_user.id)
+            assert not friend_cache.are_friends(alice.id, alice.id)
+        assert list(friend_cache.get(alice.id)) == sorted(
+            [register_user.id, friend_graph["carol"].id, friend_graph["dave"].id]
+        )
+
+    def test_accept_request_updates_cache(
+        self,
+        send_request_to_auth_client,
+        auth_client,
+        register_user,
+        django_capture_on_commit_callbacks,
+    ):
+        """
+        Test case for accepting a request updating cached friend sets in place.
+        """
+        sender = User.objects.get(username="test_super")
+        assert not friend_cache.are_friends(register_user.id, sender.id)
+
+        request_id = send_request_to_auth_client.json()["id"]
+        with django_capture_on_commit_callbacks(execute=True):
+            auth_client.put(f"/friend_request/{request_id}/accept_request/")
+
+        assert friend_cache.are_friends(register_user.id, sender.id)
+        assert friend_cache.are_friends(sender.id, register_user.id)
+
+    def test_request_to_friend_rejected(self, auth_client, friend_graph):
+        """
+        Test case for sending a friend request to an existing friend.
+        """
+        response = auth_client.post(
+            "/friend_request/", data={"to_user": friend_graph["alice"].id}
+        )
+        assert response.status_code == 400
+        assert response.json() == {"request": ["Already friends."]}
+
+    def test_lru_eviction(self, friend_graph):
+        """
+        Test case for evicting the least recently used set over the size cap.
+        """
+        small_cache = FriendCache(max_bytes=400)
+        alice, bob, carol = (friend_graph[name] for name in ("alice", "bob", "carol"))
+        small_cache.get(alice.id)
+        small_cache.get(bob.id)
+        small_cache.get(alice.id)
+        small_cache.get(carol.id)
+        assert list(small_cache._local) == [alice.id, carol.id]
+        assert small_cache._size <= 400
+
+
+@pytest.mark.django_db
+class TestCachedTokenAuthentication:
+    """
+    Test class for the cached token authentication.
+    """
+
+    def test_cache_hit_skips_token_query(self, auth_client, django_assert_num_queries):
+        """
+        Test case for authenticating from the cache after the first request.
+        """
+        token_cache.reset_stats()
+        auth_client.get("/user_friend_list/")
+        with django_assert_num_queries(1):
+            response = auth_client.get("/user_friend_list/")
+        assert response.status_code == 200
+        assert token_cache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+    def test_deleted_token_invalidated(self, auth_client, register_user):
+        """
+        Test case for rejecting a cached token once it is deleted.
+        """
+        assert auth_client.get("/user_friend_list/").status_code == 200
+        Token.objects.filter(user=register_user).delete()
+        assert auth_client.get("/user_friend_list/").status_code == 401
+
+    def test_deactivated_user_invalidated(self, auth_client, register_user):
+        """
+        Test case for rejecting a cached token once its user is deactivated.
+        """
+        assert auth_client.get("/user_friend_list/").status_code == 200
+        register_user.is_active = False
+        register_user.save()
+        assert auth_client.get("/user_friend_list/").status_code == 401
+
+    def test_bulk_deactivated_user_invalidated(self, auth_client, register_user):
+        """
+        Test case for rejecting a cached token once its user is deactivated
+        with ``QuerySet.update()``.
+        """
+        assert auth_client.get("/user_friend_list/").status_code == 200
+        User.objects.filter(pk=register_user.pk).update(is_active=False)
+        assert auth_client.get("/user_friend_list/").status_code == 401
+
+
+@pytest.mark.django_db
+class TestPasswordHashPool:
+    """
+    Test class for the password hashing pool.
+    """
+
+    def test_login_busy(self, api_client, register_user, monkeypatch):
+        """
+        Test case for shedding logins when every hashing slot is taken.
+        """
+        exhausted = threading.BoundedSemaphore(1)
+        exhausted.acquire()
+        monkeypatch.setattr(password_hash_pool, "_slots", exhausted)
+        response = api_client.post(
+            "/login/", data={"email": "test@example.com", "password": "testpassword"}
+        )
+        assert response.status_code == 503
+        assert response["Retry-After"] == "1"
+
+    def test_login_upgrades_hash_cost(
+        self, api_client, register_user, settings, monkeypatch
+    ):
+        """
+        Test case for rehashing a password when the configured cost changes.
+        """
+        monkeypatch.setattr(password_hash_pool, "workers", 0)
+        settings.PASSWORD_HASH_ITERATIONS = 2000
+        response = api_client.post(
+            "/login/", data={"email": "test@example.com", "password": "testpassword"}
+        )
+        assert response.status_code == 200
+        register_user.refresh_from_db()
+        assert register_user.password.startswith("pbkdf2_sha256$2000$")
+
+
+@pytest.mark.django_db
+class TestRateLimiting:
+    """
+    Test class for the sliding-window rate limiter and throttles.
+    """
+
+    def test_sliding_window_limiter(self):
+        """
+        Test case for allowing hits up to the limit within a window.
+        """
+        limiter = SlidingWindowRateLimiter(MemoryBackend())
+        results = [limiter.hit("key", 3, 60) for _ in range(4)]
+        assert [allowed for allowed, _ in results] == [True, True, True, False]
+        assert 0 < results[-1][1] <= 60
+        assert limiter.hit("other", 3, 60) == (True, None)
+
+    def test_friend_request_rate_limit(
+        self, auth_client, friend_graph, django_assert_max_num_queries
+    ):
+        """
+        Test case for throttling a fourth friend request within a minute.
+        """
+        targets = [
+            User.objects.create_user(
+                email=f"target{i}@example.com", password="x", username=f"target{i}"
+            )
+            for i in range(4)
+        ]
+        for target in targets[:3]:
+            response = auth_client.post("/friend_request/", data={"to_user": target.id})
+            assert response.status_code == 201
+
+        # Rejected before the serializer runs, without touching the database.
+        with django_assert_max_num_queries(0):
+            response = auth_client.post(
+                "/friend_request/", data={"to_user": targets[3].id}
+            )
+        assert response.status_code == 429
+        assert response.json()["detail"].startswith(
+            "Exceeded the limit of sending friend requests."
+        )
+        assert "Retry-After" in response
+
+    def test_rejected_requests_not_counted(self, auth_client, friend_graph):
+        """
+        Test case for only counting friend requests that were created.
+        """
+        for _ in range(3):
+            response = auth_client.post(
+                "/friend_request/", data={"to_user": friend_graph["alice"].id}
+            )
+            assert response.status_code == 400
+        targets = [friend_graph["carol"], friend_graph["dave"]]
+        for target in targets:
+            response = auth_client.post("/friend_request/", data={"to_user": target.id})
+            assert response.status_code == 201
+
+    def test_login_rate_limit(self, api_client, register_user):
+        """
+        Test case for throttling repeated login attempts from one client.
+        """
+        data = {"email": "test@example.com", "password": "wrong"}
+        statuses = [
+            api_client.post("/login/", data=data).status_code for _ in range(11)
+        ]
+        assert statuses == [400] * 10 + [429]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentResponses:
+    """
+    Test class for concurrent accept/reject calls on one friend request.
+    """
+
+    def test_parallel_accept_reject(self):
+        """
+        Test case for exactly one of many parallel responses succeeding.
+        """
+        sender, receiver = (
+            User.objects.create_user(
+                email=f"{name}@example.com", password="x", username=name
+            )
+            for name in ("sender", "receiver")
+        )
+        friendship_request = Friendship.objects.create(
+            from_user=sender, to_user=receiver
+        )
+        token = Token.objects.create(user=receiver)
+        barrier = threading.Barrier(8)
+
+        def respond(action):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+            barrier.wait()
+            try:
+                return client.put(
+                    f"/friend_request/{friendship_request.id}/{action}_request/"
+                ).status_code
+            finally:
+                connection.close()
+
+        actions = ["accept", "reject"] * 4
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            statuses = list(executor.map(respond, actions))
+
+        assert statuses.count(200) == 1
+        assert all(status in (200, 400, 404) for status in statuses)
+        friendship_request.refresh_from_db()
+        winner = actions[statuses.index(200)]
+        assert friendship_request.status == f"{winner}ed"
+        expected_edges = 2 if winner == "accept" else 0
+        assert User.friends.through.objects.count() == expected_edges
+
+
+@pytest.mark.django_db
+class TestBulkFriendRequestAPI:
+    """
+    Test class for the bulk friend request APIs.
+    """
+
+    def test_bulk_send(
+        self, auth_client, register_user, friend_graph, send_request_to_auth_client
+    ):
+        """
+        Test case for per-item results of a bulk friend request.
+        """
+        sender = User.objects.get(username="test_super")
+        targets = [
+            User.objects.create_user(
+                email=f"target{i}@example.com", password="x", username=f"target{i}"
+            )
+            for i in range(4)
+        ]
+        to_users = [
+            register_user.id,
+            friend_graph["alice"].id,
+            sender.id,
+            999999,
+            *(target.id for target in targets),
+        ]
+        response = auth_client.post(
+            "/friend_request/bulk/", data={"to_users": to_users}, format="json"
+        )
+        assert response.status_code == 200
+        errors = [item.get("error") for item in response.json()]
+        assert errors == [
+            "User can't send request to self",
+            "Already friends.",
+            "Friendship request already received",
+            'Invalid pk "999999" - object does not exist.',
+            None,
+            None,
+            None,
+            "Exceeded the limit of sending friend requests.",
+        ]
+        assert Friendship.objects.filter(from_user=register_user).count() == 3
+
+        response = auth_client.post(
+            "/friend_request/bulk/", data={"to_users": [targets[0].id]}, format="json"
+        )
+        assert response.json() == [
+            {"to_user": targets[0].id, "error": "Friendship request already exists."}
+        ]
+
+    def test_bulk_accept(self, auth_client, register_user, friend_graph):
+        """
+        Test case for accepting several requests at once.
+        """
+        carol, dave = friend_graph["carol"], friend_graph["dave"]
+        ids = [
+            Friendship.objects.create(from_user=user, to_user=register_user).id
+            for user in (carol, dave)
+        ]
+        erin = User.objects.create_user(
+            email="erin@example.com", password="x", username="erin"
+        )
+        outgoing = Friendship.objects.create(from_user=register_user, to_user=erin)
+        response = auth_client.put(
+            "/friend_request/bulk_accept/",
+            data={"ids": [*ids, outgoing.id]},
+            format="json",
+        )
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": ids[0], "status": "accepted"},
+            {"id": ids[1], "status": "accepted"},
+            {"id": outgoing.id, "error": "Not found."},
+        ]
+        assert set(register_user.friends.values_list("username", flat=True)) == {
+            "alice",
+            "bob",
+            "carol",
+            "dave",
+        }
+
+        response = auth_client.put(
+            "/friend_request/bulk_reject/", data={"ids": ids}, format="json"
+        )
+        assert [item["error"] for item in response.json()] == [
+            "its a accepted request"
+        ] * 2
+
+
+@pytest.mark.django_db
+class TestImportUsersCommand:
+    """
+    Test class for the import_users management command.
+    """
+
+    def test_import_csv(self, register_user, tmp_path, capsys):
+        """
+        Test case for importing users from CSV and skipping invalid rows.
+        """
+        encoded = User.objects.get(pk=register_user.pk).password
+        path = tmp_path / "users.csv"
+        path.write_text(
+            "username,email,password,password_hash,first_name,last_name\n"
+            "ann,ann@example.com,secret123,,Ann,Lee\n"
+            "ben,ben@example.com,,%s,Ben,Ray\n"
+            "dup,TEST@example.com,secret123,,Dup,Row\n"
+            "ann2,ANN@example.com,secret123,,Ann,Two\n"
+            "bad,not-an-email,secret123,,Bad,Row\n" % encoded
+        )
+        call_command("import_users", str(path), "--chunk-size", "2", "--workers", "0")
+
+        out, err = capsys.readouterr()
+        assert "Imported 2 users (3 skipped)" in out
+        assert "line 4: email TEST@example.com already exists" in err
+        assert "line 5: email ANN@example.com already exists" in err
+        assert User.objects.get(username="ann").check_password("secret123")
+        assert User.objects.get(username="ben").check_password("testpassword")
+
+    def test_import_jsonl(self, tmp_path):
+        """
+        Test case for importing users from JSON Lines.
+        """
+        path = tmp_path / "users.jsonl"
+        path.write_text(
+            '{"username": "cat", "email": "cat@example.com", "first_name": "Cat"}\n'
+        )
+        call_command("import_users", str(path), "--workers", "0")
+        user = User.objects.get(username="cat")
+        assert user.first_name == "Cat"
+        assert not user.has_usable_password()
+
+
+@pytest.mark.django_db
+class TestBenchmarkCommand:
+    """
+    Test class for the benchmark management command.
+    """
+
+    def test_generated_mix(self, tmp_path):
+        """
+        Test case for seeding a small graph and reporting every endpoint.
+        """
+        output = tmp_path / "report.json"
+        call_command(
+            "benchmark",
+            "--current-db",
+            "--users=20",
+            "--mean-degree=4",
+            "--requests=60",
+            f"--output={output}",
+        )
+        report = json.loads(output.read_text())
+        assert report["total"]["requests"] == 60
+        assert User.objects.count() >= 20
+        for stats in report["endpoints"].values():
+            assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+            assert stats["queries_max"] >= 1
+
+    def test_replay(self, tmp_path):
+        """
+        Test case for replaying requests from a JSON Lines file.
+        """
+        requests = tmp_path / "requests.jsonl"
+        requests.write_text(
+            '{"method": "GET", "path": "/user_friend_list/"}\n'
+            '{"method": "GET", "path": "/search_user/", "data": {"search": "Jo"}}\n'
+        )
+        output = tmp_path / "report.json"
+        call_command(
+            "benchmark",
+            "--current-db",
+            "--users=5",
+            f"--replay={requests}",
+            f"--output={output}",
+        )
+        endpoints = json.loads(output.read_text())["endpoints"]
+        assert endpoints["user_friend_list"]["statuses"] == {"200": 1}
+        assert endpoints["search_user"]["statuses"] == {"200": 1}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrency(self, tmp_path):
+        """
+        Test case for comparing WSGI and ASGI at several concurrency levels.
+        """
+        output = tmp_path / "report.json"
+        call_command(
+            "benchmark_concurrency",
+            "--current-db",
+            "--users=20",
+            "--requests=30",
+            "--concurrency=1,5",
+            "--threads=2",
+            f"--output={output}",
+        )
+        interfaces = json.loads(output.read_text())["interfaces"]
+        assert set(interfaces) == {"wsgi", "asgi"}
+        for levels in interfaces.values():
+            assert set(levels) == {"1", "5"}
+            for stats in levels.values():
+                assert stats["statuses"] == {"200": 30}
+                assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+
+
+@pytest.mark.django_db
+class TestQueryInstrumentation:
+    """
+    Test class for the query instrumentation middleware and stats view.
+    """
+
+    @pytest.fixture
+    def admin_client(self, settings, friend_graph):
+        """
+        Fixture for an admin client with instrumentation enabled.
+        """
+        settings.QUERY_INSTRUMENTATION = True
+        query_stats.reset()
+        admin = User.objects.get(username="testuser")
+        admin.is_staff = True
+        admin.save()
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION="Token " + Token.objects.get_or_create(user=admin)[0].key
+        )
+        return client
+
+    def test_server_timing_and_stats(self, admin_client):
+        """
+        Test case for the Server-Timing header and aggregated stats.
+        """
+        for _ in range(2):
+            response = admin_client.get("/user_friend_list/")
+        assert response.status_code == 200
+        timing = response["Server-Timing"]
+        assert "db;dur=" in timing and "1 queries, 0 duplicates" in timing
+        assert "serialize;dur=" in timing and "render;dur=" in timing
+        assert "total;dur=" in timing
+
+        stats = admin_client.get("/debug/query_stats/").json()
+        friend_list = stats["views"]["friend_list"]
+        assert friend_list["requests"] == 2
+        assert friend_list["serialize_ms_mean"] > 0
+        # The first request also loads the token into the cache.
+        assert friend_list["queries_mean"] == 1.5
+        assert friend_list["queries_max"] == 2
+        assert stats["token_cache"]["hits"] >= 1
+
+        assert admin_client.delete("/debug/query_stats/").status_code == 204
+        stats = admin_client.get("/debug/query_stats/").json()
+        assert "friend_list" not in stats["views"]
+
+    def test_duplicate_statements(self, admin_client):
+        """
+        Test case for detecting repeated statements within a request.
+        """
+        metrics = RequestMetrics()
+        with connection.execute_wrapper(metrics):
+            for username in ("alice", "bob"):
+                User.objects.filter(username=username).exists()
+        assert metrics.queries == 2
+        assert metrics.duplicates == 1
+
+    def test_non_admin(self, settings, auth_client):
+        """
+        Test case for hiding the stats from non-admin users.
+        """
+        settings.QUERY_INSTRUMENTATION = True
+        response = auth_client.get("/debug/query_stats/")
+        assert response.status_code == 403
+
+    def test_disabled(self, admin_client, settings):
+        """
+        Test case for the middleware dropping out when disabled.
+        """
+        settings.QUERY_INSTRUMENTATION = False
+        # Middleware is loaded when a client handles its first request.
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username="testuser"))
+        response = client.get("/user_friend_list/")
+        assert "Server-Timing" not in response
+        assert client.get("/debug/query_stats/").status_code == 404
+
+
+@pytest.mark.django_db
+class TestReadSerializers:
+    """
+    Test class for the .values() read serializers.
+    """
+
+    def test_same_output(self, friend_graph, register_user):
+        """
+        Test case for matching the model serializers' output exactly.
+        """
+        users = User.objects.order_by("id")
+        assert (
+            UserReadSerializer(UserReadSerializer.values(users), many=True).data
+            == UserSerializer(users, many=True).data
+        )
+
+        for sender in User.objects.exclude(pk=register_user.pk)[:2]:
+            Friendship.objects.create(from_user=sender, to_user=register_user)
+        requests = Friendship.objects.order_by("id")
+        expected = FriendshipRequestSerializer(requests, many=True).data
+        assert json.dumps(
+            FriendshipRequestReadSerializer(
+                FriendshipRequestReadSerializer.values(requests), many=True
+            ).data
+        ) == json.dumps(expected)
+
+    def test_microbenchmark(self, tmp_path):
+        """
+        Test case for the serializer and renderer microbenchmark report.
+        """
+        output = tmp_path / "report.json"
+        call_command(
+            "microbenchmark",
+            "--current-db",
+            "--rows=10",
+            "--repeat=1",
+            f"--output={output}",
+        )
+        report = json.loads(output.read_text())
+        assert set(report["serializers"]) == {
+            "users",
+            "users_serialize",
+            "friend_requests",
+            "friend_requests_serialize",
+        }
+        assert report["serializers"]["users"]["fast"] > 0
+        assert set(report["renderers"]) == {
+            "users",
+            "friend_requests",
+            "parse_friend_requests",
+        }
+        assert report["connections"]["persistent"]["unit"] == "requests"
+
+
+class TestFastJSON:
+    """
+    Test class for the orjson renderer and parser.
+    """
+
+    payloads = [
+        {"name": "Jöhn 😀", "sep": "a\u2028b\u2029c", "nested": [1, 2.5, None, True]},
+        {
+            "aware": datetime(2023, 6, 1, 12, 30, 5, 123456, tzinfo=dt_timezone.utc),
+            "naive": datetime(2023, 6, 1, 12, 30),
+            "date": date(2023, 6, 1),
+            "time": time(12, 30, 5, 1000),
+        },
+        {"decimal": Decimal("1.10"), "uuid": uuid.UUID(int=1), 3: "int key"},
+        {"lazy": gettext_lazy("Not found."), "set": {1}, "big": 2**70},
+        [],
+    ]
+
+    @pytest.mark.parametrize("payload", payloads)
+    def test_byte_compatible(self, payload):
+        """
+        Test case for rendering the same bytes as DRF's JSONRenderer.
+        """
+        assert FastJSONRenderer().render(payload) == JSONRenderer().render(payload)
+
+    def test_indent_and_empty(self):
+        """
+        Test case for indented and empty responses.
+        """
+        renderer = FastJSONRenderer()
+        assert renderer.render(None) == b""
+        media_type = "application/json; indent=4"
+        assert renderer.render({"a": 1}, media_type) == JSONRenderer().render(
+            {"a": 1}, media_type
+        )
+
+    @pytest.mark.parametrize("value", [float("nan"), float("inf"), -float("inf")])
+    def test_non_finite_float(self, value):
+        """
+        Test case for rejecting NaN and infinity like DRF's JSONRenderer.
+        """
+        for renderer in (FastJSONRenderer(), JSONRenderer()):
+            with pytest.raises(ValueError):
+                renderer.render({"nested": [1.5, None, value]})
+
+    @pytest.mark.django_db
+    def test_login_output(self, api_client, register_user):
+        """
+        Test case for rendering the login response with the fast renderer.
+        """
+        response = api_client.post(
+            "/login/", data={"email": "test@example.com", "password": "testpassword"}
+        )
+        assert isinstance(response.accepted_renderer, FastJSONRenderer)
+
+    @pytest.mark.django_db
+    def test_endpoint_output(self, auth_client, friend_graph):
+        """
+        Test case for an API response rendered with the fast renderer.
+        """
+        response = auth_client.get("/user_friend_list/")
+        assert isinstance(response.accepted_renderer, FastJSONRenderer)
+        assert response.content == JSONRenderer().render(response.data)
+
+    def test_parse(self):
+        """
+        Test case for parsing request bodies, valid or not.
+        """
+        body = '{"to_users": [1, 2], "name": "Jöhn"}'.encode()
+        assert FastJSONParser().parse(io.BytesIO(body)) == {
+            "to_users": [1, 2],
+            "name": "Jöhn",
+        }
+        with pytest.raises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"to_users": NaN}'))
+
+    def test_fallback_without_orjson(self, monkeypatch):
+        """
+        Test case for falling back to DRF when orjson is not installed.
+        """
+        monkeypatch.setattr(renderers, "orjson", None)
+        monkeypatch.setattr(parsers, "orjson", None)
+        payload = self.payloads[0]
+        assert FastJSONRenderer().render(payload) == JSONRenderer().render(payload)
+        assert FastJSONParser().parse(io.BytesIO(b"[1]")) == [1]
+
+
+@pytest.mark.django_db
+class TestSchemaCache:
+    """
+    Test class for the cached OpenAPI schema.
+    """
+
+    @pytest.fixture(autouse=True)
+    def cache_file(self, settings, tmp_path):
+        """
+        Fixture for pointing the schema cache at a temporary file.
+        """
+        settings.SCHEMA_CACHE_FILE = tmp_path / "schema.json"
+        schema_cache.clear()
+        yield settings.SCHEMA_CACHE_FILE
+        schema_cache.clear()
+
+    @pytest.mark.parametrize(
+        "accept", ["application/vnd.oai.openapi", "application/json"]
+    )
+    def test_same_document(self, api_client, accept):
+        """
+        Test case for serving the document SpectacularAPIView generates.
+        """
+        request = APIRequestFactory().get("/api/schema/", HTTP_ACCEPT=accept)
+        expected = SpectacularAPIView.as_view()(request).render()
+        api_client.credentials()
+        response = api_client.get("/api/schema/", HTTP_ACCEPT=accept)
+        assert response.status_code == 200
+        assert response["Content-Type"] == expected["Content-Type"]
+        assert response["Content-Disposition"] == expected["Content-Disposition"]
+        assert response.content == expected.content
+
+    def test_etag(self, api_client, cache_file):
+        """
+        Test case for ETag revalidation and reuse of the cache file.
+        """
+        api_client.credentials()
+        response = api_client.get("/api/schema/")
+        etag = response["ETag"]
+        assert cache_file.exists()
+
+        response = api_client.get("/api/schema/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response.content == b""
+
+        # A new process reads the document from disk instead of generating it.
+        cache = SchemaCache()
+        content, cached_etag = cache.get(
+            None, "application/vnd.oai.openapi", OpenApiYamlRenderer(), pytest.fail
+        )
+        assert cached_etag == etag
+        assert content == api_client.get("/api/schema/").content
+
+    def test_code_change(self, cache_file, monkeypatch):
+        """
+        Test case for ignoring a cache file written for other code.
+        """
+        call_command("generate_schema")
+        monkeypatch.setattr(schema, "source_fingerprint", lambda: "changed")
+        cache = SchemaCache()
+        calls = []
+        cache.get(
+            None,
+            "application/vnd.oai.openapi",
+            OpenApiYamlRenderer(),
+            lambda: calls.append(1) or {"openapi": "3.0.3"},
+        )
+        assert calls == [1]
+
+    def test_urlconf_and_settings_change(self, settings, monkeypatch):
+        """
+        Test case for fingerprinting the served URL patterns and settings,
+        which differ between WSGI and ASGI processes sharing the cache file.
+        """
+        fingerprint = schema.source_fingerprint()
+        root_urlconf = settings.ROOT_URLCONF
+        urlconf = ModuleType("schema_async_urls")
+        urlconf.urlpatterns = [
+            *async_read_urlpatterns,
+            path("", include(root_urlconf)),
+        ]
+        monkeypatch.setitem(sys.modules, urlconf.__name__, urlconf)
+        settings.ROOT_URLCONF = urlconf.__name__
+        assert schema.source_fingerprint() != fingerprint
+
+        settings.ROOT_URLCONF = root_urlconf
+        assert schema.source_fingerprint() == fingerprint
+        settings.SPECTACULAR_SETTINGS = {"TITLE": "Other"}
+        assert schema.source_fingerprint() != fingerprint
+
+
+def async_request(method, *args, **kwargs):
+    """
+    Make a request with an AsyncClient from a sync test, so that the async
+    ORM shares the test's database connection.
+    """
+
+    async def request():
+        return await getattr(AsyncClient(), method)(*args, **kwargs)
+
+    return async_to_sync(request)()
+
+
+@pytest.mark.django_db
+class TestAsyncReadViews:
+    """
+    Test class for the async read views served under ASGI.
+    """
+
+    @pytest.fixture
+    def auth_headers(self, settings, auth_client, friend_graph):
+        """
+        Fixture for the authorization header of the first user, with the async
+        views mounted under /async/ next to the regular URLs.
+        """
+        urlconf = ModuleType("async_urls")
+        urlconf.urlpatterns = [
+            path("async/", include(async_read_urlpatterns)),
+            path("", include("social_network.urls")),
+        ]
+        settings.ROOT_URLCONF = urlconf
+        for sender in ("carol", "dave"):
+            Friendship.objects.create(
+                from_user=friend_graph[sender], to_user=User.objects.first()
+            )
+        token = Token.objects.get(user=User.objects.first())
+        # AsyncClient(headers=...) defaults do not reach the ASGI scope in
+        # Django 4.2, so headers are passed with every request.
+        return {"Authorization": f"Token {token.key}"}
+
+    @pytest.mark.parametrize(
+        "path, params",
+        [
+            ("search_user/", {"search": "alice@example.com"}),
+            ("search_user/", {"page_size": 2}),
+            ("user_friend_list/", {}),
+            ("user_friend_list/", {"page_size": 1}),
+            ("friend_request/", {}),
+            ("friend_request/", {"page_size": 1}),
+        ],
+    )
+    def test_same_response(self, auth_headers, auth_client, path, params):
+        """
+        Test case for returning the same body as the DRF views.
+        """
+        expected = auth_client.get(f"/{path}", params)
+        response = async_request("get", f"/async/{path}", params, headers=auth_headers)
+        assert response.status_code == expected.status_code == 200
+        assert response["Content-Type"] == expected["Content-Type"]
+        assert response.content.replace(b"/async/", b"/") == expected.content
+
+        if "page_size" in params:
+            # Follow the cursor to the second page.
+            next_link = response.json()["next"]
+            expected = auth_client.get(expected.json()["next"])
+            response = async_request("get", next_link, headers=auth_headers)
+            assert response.content.replace(b"/async/", b"/") == expected.content
+
+    def test_queries(self, auth_headers, django_assert_num_queries):
+        """
+        Test case for authenticating from the token cache.
+        """
+        url = "/async/user_friend_list/"
+        async_request("get", url, headers=auth_headers)
+        with django_assert_num_queries(1):
+            response = async_request("get", url, headers=auth_headers)
+        assert [user["username"] for user in response.json()] == ["alice", "bob"]
+
+    @pytest.mark.parametrize(
+        "headers, detail",
+        [
+            ({}, "Authentication credentials were not provided."),
+            ({"Authorization": "Token nope"}, "Invalid token."),
+        ],
+    )
+    def test_unauthenticated(self, auth_headers, headers, detail):
+        """
+        Test case for rejecting requests without a valid token.
+        """
+        response = async_request("get", "/async/search_user/", headers=headers)
+        assert response.status_code == 401
+        assert response["WWW-Authenticate"] == "Token"
+        assert response.json() == {"detail": detail}
+
+    def test_session_browsable_api(self, auth_headers):
+        """
+        Test case for the DRF session authentication and browsable API.
+        """
+
+        user = User.objects.first()
+
+        async def request():
+            client = AsyncClient()
+            await sync_to_async(client.force_login)(user)
+            return await client.get(
+                "/async/user_friend_list/", headers={"Accept": "text/html"}
+            )
+
+        response = async_to_sync(request)()
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/html")
+        assert b"alice@example.com" in response.content
+
+    def test_schema(self):
+        """
+        Test case for documenting the async views like the DRF views.
+        """
+        generated = SchemaGenerator(patterns=async_read_urlpatterns).get_schema(
+            public=True
+        )
+        expected = SchemaGenerator(patterns=sync_read_urlpatterns).get_schema(
+            public=True
+        )
+        for url in ("/search_user/", "/user_friend_list/"):
+            assert generated["paths"][url] == expected["paths"][url]
+
+    def test_fallback(self, auth_headers):
+        """
+        Test case for sending a request through the DRF viewset.
+        """
+        erin = User.objects.create_user(username="erin", email="erin@example.com")
+        response = async_request(
+            "post",
+            "/async/friend_request/",
+            {"to_user": erin.id},
+            content_type="application/json",
+            headers=auth_headers,
+        )
+        assert response.status_code == 201
+        assert Friendship.objects.filter(to_user=erin, status="pending").exists()
+
+
+class TestProductionLaunch:
+    """
+    Test class for the prod settings profile and the gunicorn configuration.
+    """
+
+    def test_prod_requires_secret_key(self):
+        """
+        Test case for refusing to start the prod profile without a secret key
+        or a shared cache.
+        """
+        env = {**os.environ, "DJANGO_ENV": "prod"}
+        env.pop("DJANGO_SECRET_KEY", None)
+        env.pop("REDIS_URL", None)
+        code = "import social_network.settings"
+
+        def run():
+            return subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=django_settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+
+        result = run()
+        assert result.returncode != 0
+        assert "DJANGO_SECRET_KEY" in result.stderr
+
+        env["DJANGO_SECRET_KEY"] = "secret"
+        result = run()
+        assert result.returncode != 0
+        assert "REDIS_URL" in result.stderr
+
+        env["REDIS_URL"] = "redis://redis"
+        code += "; print(social_network.settings.DEBUG)"
+        result = run()
+        assert result.stdout.strip() == "False"
+
+    @pytest.mark.parametrize(
+        "interface, app, worker_class",
+        [
+            ("wsgi", "social_network.wsgi:application", "gthread"),
+            (
+                "asgi",
+                "social_network.asgi:application",
+                "uvicorn.workers.UvicornWorker",
+            ),
+        ],
+    )
+    def test_gunicorn_config(self, monkeypatch, interface, app, worker_class):
+        """
+        Test case for sizing and recycling workers for each interface.
+        """
+        monkeypatch.setenv("SERVER_INTERFACE", interface)
+        monkeypatch.setenv("SERVER_MAX_REQUESTS", "500")
+        monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+        config = runpy.run_path(str(django_settings.BASE_DIR / "gunicorn.conf.py"))
+        assert config["wsgi_app"] == app
+        assert config["worker_class"] == worker_class
+        assert config["workers"] >= os.cpu_count()
+        assert config["max_requests"] == 500
+        assert config["max_requests_jitter"] == 50
+        assert config["preload_app"] is True
+
+
+class FakeConnection:
+    """
+    Stand-in for a DB-API connection in the pool tests.
+    """
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool:
+    """
+    Test class for the per-process database connection pool.
+    """
+
+    def test_reuse(self):
+        """
+        Test case for handing out the released connection again.
+        """
+        pool = ConnectionPool(max_size=2, timeout=1)
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        assert pool.acquire(FakeConnection) is first
+        second = pool.acquire(FakeConnection)
+        assert second is not first
+        stats = pool.stats()
+        assert stats["created"] == 2
+        assert stats["checkouts"] == 3
+        assert stats["in_use"] == 2
+        assert stats["waits"] == 0
+
+    def test_wait_for_release(self):
+        """
+        Test case for capping connections and waiting for a free one.
+        """
+        pool = ConnectionPool(max_size=1, timeout=5)
+        held = pool.acquire(FakeConnection)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            waiting = executor.submit(pool.acquire, FakeConnection)
+            while not pool.stats()["waits"]:
+                pass
+            pool.release(held)
+            assert waiting.result() is held
+        stats = pool.stats()
+        assert stats["created"] == 1
+        assert stats["waits"] == 1
+        assert stats["max_wait_ms"] > 0
+
+    def test_timeout(self):
+        """
+        Test case for giving up when no connection is released in time.
+        """
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.acquire(FakeConnection)
+        with pytest.raises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        assert pool.stats()["timeouts"] == 1
+
+    def test_discard_unusable(self):
+        """
+        Test case for replacing idle connections that fail the check.
+        """
+        pool = ConnectionPool(
+            max_size=1, timeout=1, check=lambda connection: not connection.closed
+        )
+        stale = pool.acquire(FakeConnection)
+        pool.release(stale)
+        stale.closed = True
+        fresh = pool.acquire(FakeConnection)
+        assert fresh is not stale
+        assert pool.stats()["discarded"] == 1
+
+        pool.release(fresh, discard=True)
+        assert fresh.closed
+        assert pool.stats()["size"] == 0
+
+    def test_failed_connect(self):
+        """
+        Test case for freeing the slot of a connection that failed to open.
+        """
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+
+        def refuse():
+            raise OSError("refused")
+
+        with pytest.raises(OSError):
+            pool.acquire(refuse)
+        assert pool.acquire(FakeConnection) is not None
+
+    @pytest.mark.parametrize(
+        "module, pool_size, conn_max_age",
+        [
+            ("social_network.wsgi", "0", "60"),
+            ("social_network.asgi", "0", "0"),
+            ("social_network.asgi", "2", "0"),
+        ],
+    )
+    def test_asgi_conn_max_age(self, module, pool_size, conn_max_age):
+        """
+        Test case for not keeping connections of ASGI worker threads.
+        """
+        env = {**os.environ, "DB_CONN_MAX_AGE": "60", "DB_POOL_SIZE": pool_size}
+        env.pop("SERVER_INTERFACE", None)
+        code = f"import {module}; from django.conf import settings; "
+        code += "print(settings.DB_CONN_MAX_AGE)"
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=django_settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        assert result.stdout.strip() == conn_max_age
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReadReplicas:
+    """
+    Test class for routing list reads to a replica with read-your-writes
+    pinning.
+    """
+
+    @pytest.fixture
+    def replica(self, settings):
+        """
+        Fixture for a "replica" alias: a second connection to the test
+        database. Tests commit their data so that it can see it.
+        """
+        connections.settings["replica"] = {
+            **connections["default"].settings_dict,
+            "TEST": {"MIRROR": "default"},
+        }
+        settings.DATABASE_REPLICAS = ["replica"]
+        yield connections["replica"]
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+
+    def test_router(self, replica):
+        """
+        Test case for sending only opted-in reads to the replica.
+        """
+        assert router.db_for_read(User) == "default"
+        with read_from_replica():
+            assert router.db_for_read(User) == "replica"
+            assert router.db_for_write(User) == "default"
+        assert router.allow_migrate("replica", "social_api") is False
+        assert router.allow_migrate("default", "social_api") is True
+
+    def test_list_reads_from_replica(self, replica, auth_client, friend_graph):
+        """
+        Test case for serving the friend list from the replica.
+        """
+        # Registering pinned the user to the primary.
+        cache.clear()
+        with CaptureQueriesContext(replica) as replica_queries:
+            response = auth_client.get("/user_friend_list/")
+        assert response.status_code == 200
+        assert [user["username"] for user in response.json()] == ["alice", "bob"]
+        assert len(replica_queries) == 1
+
+    def test_writes_pin_to_primary(self, replica, auth_client, friend_graph):
+        """
+        Test case for reading from the primary after sending a request.
+        """
+        erin = User.objects.create_user(username="erin", email="erin@example.com")
+        response = auth_client.post("/friend_request/", {"to_user": erin.id})
+        assert response.status_code == 201
+
+        with CaptureQueriesContext(replica) as replica_queries:
+            response = auth_client.get("/user_friend_list/")
+        assert response.status_code == 200
+        assert len(replica_queries) == 0
+        assert not use_replica(erin)
+        assert use_replica(friend_graph["bob"])
+
+    def test_register_pins_to_primary(self, replica, api_client, register_data):
+        """
+        Test case for pinning a newly registered user.
+        """
+        api_client.credentials()
+        response = api_client.post("/register/", data=register_data)
+        assert response.status_code == 201
+        assert not use_replica(User.objects.get(username="testuser"))
+
+
+@pytest.mark.django_db
+class TestUserCounters:
+    """
+    Test class for the denormalized friend and pending request counters.
+    """
+
+    def counts(self, *users):
+        return [
+            tuple(
+                User.objects.values_list("friend_count", "pending_request_count").get(
+                    pk=user.pk
+                )
+            )
+            for user in users
+        ]
+
+    def test_request_lifecycle(
+        self, auth_client, register_user, send_request_to_auth_client
+    ):
+        """
+        Test case for counting a request until it is accepted.
+        """
+        sender = User.objects.get(username="test_super")
+        assert self.counts(register_user, sender) == [(0, 1), (0, 0)]
+
+        request_id = send_request_to_auth_client.json()["id"]
+        auth_client.put(f"/friend_request/{request_id}/accept_request/")
+        assert self.counts(register_user, sender) == [(1, 0), (1, 0)]
+
+        register_user.friends.remove(sender)
+        assert self.counts(register_user, sender) == [(0, 0), (0, 0)]
+
+    def test_reject(self, auth_client, register_user, send_request_to_auth_client):
+        """
+        Test case for uncounting a rejected request.
+        """
+        request_id = send_request_to_auth_client.json()["id"]
+        auth_client.put(f"/friend_request/{request_id}/reject_request/")
+        assert self.counts(register_user) == [(0, 0)]
+
+    def test_friends_add_and_clear(self, register_user, friend_graph):
+        """
+        Test case for counting friends changed through ``User.friends``.
+        """
+        users = [register_user, *friend_graph.values()]
+        assert self.counts(*users) == [(2, 0), (3, 0), (2, 0), (2, 0), (1, 0)]
+
+        friend_graph["alice"].friends.clear()
+        assert self.counts(*users) == [(1, 0), (0, 0), (2, 0), (1, 0), (0, 0)]
+
+    def test_friends_remove_non_friend(self, register_user, friend_graph):
+        """
+        Test case for counting only the removed friends that were friends.
+        """
+        users = [register_user, *friend_graph.values()]
+        register_user.friends.remove(friend_graph["alice"], friend_graph["carol"])
+        assert self.counts(*users) == [(1, 0), (2, 0), (2, 0), (2, 0), (1, 0)]
+
+    def test_add_friend_edges_race(self, friend_graph, monkeypatch):
+        """
+        Test case for not counting a pair that another request inserted first.
+        """
+        carol, dave = friend_graph["carol"], friend_graph["dave"]
+        through = User.friends.through
+        bulk_create = through.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            # Another request makes them friends after the edges were read.
+            carol.friends.add(dave)
+            return bulk_create(objs, **kwargs)
+
+        monkeypatch.setattr(through.objects, "bulk_create", racing_bulk_create)
+        add_friend_edges([(dave.id, carol.id)])
+        assert self.counts(carol, dave) == [(3, 0), (2, 0)]
+
+    def test_bulk(self, auth_client, register_user, friend_graph):
+        """
+        Test case for counting bulk sent and accepted requests.
+        """
+        carol, dave = friend_graph["carol"], friend_graph["dave"]
+        auth_client.post(
+            "/friend_request/bulk/", data={"to_users": [carol.id]}, format="json"
+        )
+        assert self.counts(carol) == [(2, 1)]
+
+        ids = [Friendship.objects.create(from_user=dave, to_user=register_user).id]
+        User.objects.filter(pk=register_user.pk).update(pending_request_count=1)
+        auth_client.put("/friend_request/bulk_accept/", {"ids": ids}, format="json")
+        assert self.counts(register_user, dave) == [(3, 0), (2, 0)]
+
+    def test_summary(self, auth_client, register_user, send_request_to_auth_client):
+        """
+        Test case for reading the counters in one query.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = auth_client.get("/profile/summary/")
+        assert response.status_code == 200
+        assert response.json() == {
+            "id": register_user.id,
+            "username": "testuser",
+            "email": "test@example.com",
+            "first_name": "John",
+            "friend_count": 0,
+            "pending_request_count": 1,
+        }
+        assert len(queries) == 1
+
+    def test_reconcile_command(self, register_user, friend_graph, capsys):
+        """
+        Test case for reporting and repairing drifted counters.
+        """
+        User.objects.filter(pk=register_user.pk).update(
+            friend_count=7, pending_request_count=3
+        )
+        call_command("reconcile_counts", "--dry-run", "--batch-size", "2")
+        assert "Found 1 users with drifted counts." in capsys.readouterr().out
+        assert self.counts(register_user) == [(7, 3)]
+
+        call_command("reconcile_counts", "--batch-size", "2")
+        assert "Fixed 1 users with drifted counts." in capsys.readouterr().out
+        assert self.counts(register_user) == [(2, 0)]
@@ -0,0 +1,179 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import ScopedRateThrottle
+
+
+class MemoryBackend:
+    """
+    Process-local counter store, for single-process deployments and tests.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            entries = [(key, self._counters.get(key)) for key in keys]
+        return {key: entry[0] for key, entry in entries if entry and entry[1] > now}
+
+    def incr(self, key, ttl, delta=1):
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._counters.get(key, (0, 0))
+            if expires <= now:
+                value, expires = 0, now + ttl
+                self._purge(now)
+            self._counters[key] = (value + delta, expires)
+            return value + delta
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+    def _purge(self, now):
+        expired = [
+            key for key, (_, expires) in self._counters.items() if expires <= now
+        ]
+        for key in expired:
+            del self._counters[key]
+
+
+class CacheBackend:
+    """
+    Counter store on a Django cache, shared between workers when the cache is.
+    """
+
+    def __init__(self, alias=None):
+        self.alias = alias or getattr(settings, "RATE_LIMIT_CACHE_ALIAS", "default")
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def incr(self, key, ttl, delta=1):
+        self.cache.add(key, 0, ttl)
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            # The key expired between add() and incr().
+            self.cache.add(key, delta, ttl)
+            return delta
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding-window counter rate limiter.
+
+    Hits are counted in fixed windows; the rate at any instant is the current
+    window's count plus the previous window's count weighted by how much of
+    it still overlaps the sliding window. Rejected hits are not counted. Each
+    check costs one ``get_many`` plus one ``incr`` on the backend and never
+    touches the database.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def hit(self, key, limit, window):
+        """
+        Record a hit on ``key`` if it is within ``limit`` hits per ``window``
+        seconds. Return ``(allowed, wait)``, where ``wait`` is the number of
+        seconds until a hit would be allowed again.
+        """
+        granted, wait = self.take(key, limit, window)
+        return bool(granted), wait
+
+    def take(self, key, limit, window, count=1, record=True):
+        """
+        Record as many of ``count`` hits on ``key`` as the limit allows.
+        Return ``(granted, wait)``; ``wait`` is ``None`` if all were granted.
+        With ``record=False`` the hits are only checked, not recorded.
+        """
+        now = time.time()
+        index, elapsed = divmod(now, window)
+        index = int(index)
+        current_key, previous_key = f"{key}:{index}", f"{key}:{index - 1}"
+
+        counts = self.backend.get_many([previous_key, current_key])
+        previous = counts.get(previous_key, 0)
+        current = counts.get(current_key, 0)
+        overlap = (window - elapsed) / window
+        granted = max(0, min(count, math.floor(limit - previous * overlap - current)))
+        if granted and record:
+            self.backend.incr(current_key, 2 * window, granted)
+            current += granted
+        if granted == count:
+            return granted, None
+
+        if current < limit and previous:
+            # Wait for the previous window's weight to drop far enough.
+            wait = window - (limit - current - 1) * window / previous - elapsed
+        else:
+            wait = window - elapsed
+        return granted, max(wait, 0)
+
+
+_backends = {}
+
+
+def get_rate_limiter():
+    """
+    Return the limiter for the backend named by ``RATE_LIMIT_BACKEND``
+    (``"cache"`` or ``"memory"``).
+    """
+    name = getattr(settings, "RATE_LIMIT_BACKEND", "cache")
+    if name not in _backends:
+        backend = MemoryBackend() if name == "memory" else CacheBackend()
+        _backends[name] = SlidingWindowRateLimiter(backend)
+    return _backends[name]
+
+
+class SlidingWindowThrottle(ScopedRateThrottle):
+    """
+    DRF throttle for views with a ``throttle_scope``, backed by
+    ``SlidingWindowRateLimiter``. Rates come from ``DEFAULT_THROTTLE_RATES``.
+    """
+
+    cache_format = "ratelimit:%(scope)s:%(ident)s"
+
+    def __init__(self, record=True):
+        """
+        With ``record=False`` requests are only checked against the limit; the
+        view records its hits with ``take()``, e.g. once an insert succeeded.
+        """
+        super().__init__()
+        self.record = record
+
+    def allow_request(self, request, view):
+        if not getattr(view, self.scope_attr, None):
+            return True
+        return self.take(request, view, 1, record=self.record) == 1
+
+    def take(self, request, view, count, record=True):
+        """
+        Consume up to ``count`` hits for one request, e.g. a batch of items,
+        and return how many were granted.
+        """
+        self.scope = getattr(view, self.scope_attr, None)
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        granted, self._wait = get_rate_limiter().take(
+            self.get_cache_key(request, view),
+            self.num_requests,
+            self.duration,
+            count,
+            record,
+        )
+        return granted
+
+    def wait(self):
+        return self._wait
@@ -1,21 +1,57 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
+from social_api.async_views import (
+    AsyncPendingRequestList,
+    AsyncUserFriendsList,
+    AsyncUserSearchView,
+)
 from social_api.views import (
     FriendshipRequestAPIView,
+    FriendSuggestionsList,
+    MutualFriendsList,
+    QueryStatsView,
     RegisterView,
     UserFriendsList,
     UserLoginView,
     UserSearchView,
+    UserSummaryView,
 )
 
 router = DefaultRouter()
 router.register(r"friend_request", FriendshipRequestAPIView, basename="send_request")
 
+# Read endpoints, served by DRF views with an async GET under ASGI.
+sync_read_urlpatterns = [
+    path("search_user/", UserSearchView.as_view(), name="search"),
+    path("user_friend_list/", UserFriendsList.as_view(), name="friend_list"),
+]
+async_read_urlpatterns = [
+    path("search_user/", AsyncUserSearchView.as_view(), name="search"),
+    path("user_friend_list/", AsyncUserFriendsList.as_view(), name="friend_list"),
+    path(
+        "friend_request/",
+        AsyncPendingRequestList.as_view({"get": "list", "post": "create"}),
+        name="send_request-list",
+    ),
+]
+
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="auth_register"),
     path("login/", UserLoginView.as_view(), name="auth_login"),
-    path("search_user/", UserSearchView.as_view(), name="search"),
-    path("user_friend_list/", UserFriendsList.as_view(), name="friend_list"),
+    path("profile/summary/", UserSummaryView.as_view(), name="user_summary"),
+    *(async_read_urlpatterns if settings.ASYNC_READ_VIEWS else sync_read_urlpatterns),
+    path(
+        "mutual_friends/<int:user_id>/",
+        MutualFriendsList.as_view(),
+        name="mutual_friends",
+    ),
+    path(
+        "friend_suggestions/",
+        FriendSuggestionsList.as_view(),
+        name="friend_suggestions",
+    ),
+    path("debug/query_stats/", QueryStatsView.as_view(), name="query_stats"),
 ]
 urlpatterns += router.urls
@@ -1,21 +1,46 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
-from rest_framework import filters, generics, viewsets
+from rest_framework import generics, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import action
-from rest_framework.exceptions import APIException, MethodNotAllowed
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import (
+    APIException,
+    MethodNotAllowed,
+    NotFound,
+    Throttled,
+)
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from .authentication import token_cache
+from .cache import friend_cache
+from .filters import UserSearchFilter
+from .graph import add_friend_edges, adjust_counts, friend_suggestions, mutual_friends
+from .instrumentation import query_stats, serializer_data
 from .models import Friendship
+from .pagination import MutualFriendsPagination, PendingRequestPagination
+from .pool import pool_stats, reset_pool_stats
+from .replicas import pin_to_primary, read_from_replica, use_replica
 from .serializers import (
+    BulkFriendshipRequestSerializer,
+    FriendshipRequestIdsSerializer,
+    FriendshipRequestReadSerializer,
     FriendshipRequestSerializer,
+    FriendSuggestionSerializer,
     RegisterSerializer,
-    UserfriendSerializer,
     UserLoginSerializer,
+    UserReadSerializer,
     UserSerializer,
+    UserSummarySerializer,
 )
+from .throttling import SlidingWindowThrottle
 
 User = get_user_model()
 
@@ -37,6 +62,38 @@ class BaseException(APIException):
         super().__init__()
 
 
+class ValuesListMixin:
+    """
+    Serve ``list`` from ``.values()`` rows rendered by
+    ``read_serializer_class``, skipping model instances and DRF's per-field
+    serialization. ``serializer_class`` still documents the (identical)
+    output and handles every other action.
+    """
+
+    read_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.read_serializer_class
+        queryset = serializer_class.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            data = serializer_data(request, serializer_class(page, many=True))
+            return self.get_paginated_response(data)
+        return Response(serializer_data(request, serializer_class(queryset, many=True)))
+
+
+class ReplicaReadMixin:
+    """
+    Serve ``list`` from a read replica, unless the user has written
+    something recently (see ``social_api.replicas``).
+    """
+
+    def list(self, request, *args, **kwargs):
+        with read_from_replica(use_replica(request.user)):
+            return super().list(request, *args, **kwargs)
+
+
 @extend_schema(description="Register User,Email is case insensitive")
 class RegisterView(generics.CreateAPIView):
     """
@@ -48,6 +105,12 @@ class RegisterView(generics.CreateAPIView):
     permission_classes = [
         AllowAny,
     ]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "register"
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        pin_to_primary(serializer.instance.pk)
 
 
 class UserLoginView(ObtainAuthToken):
@@ -55,6 +118,11 @@ class UserLoginView(ObtainAuthToken):
     View for user login.
     """
 
+    # ObtainAuthToken pins DRF's JSONRenderer.
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "login"
+
     @extend_schema(request=UserLoginSerializer, methods=["POST"])
     @extend_schema(description="Email is case insensitive", methods=["POST"])
     def post(self, request, *args, **kwargs):
@@ -62,48 +130,127 @@ class UserLoginView(ObtainAuthToken):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data["user"]
 
-        token, created = Token.objects.get_or_create(user=user)
+        try:
+            token = user.auth_token
+        except Token.DoesNotExist:
+            token = self.create_token(user)
 
         return Response({"token": token.key})
 
+    @staticmethod
+    def create_token(user):
+        """
+        Create the user's token, or fetch it if a concurrent login won.
+        """
+        try:
+            with transaction.atomic():
+                return Token.objects.create(user=user)
+        except IntegrityError:
+            return Token.objects.get(user=user)
+
 
 @extend_schema(
     description="User Search by exact email or first/last name", methods=["GET"]
 )
-class UserSearchView(generics.ListAPIView):
+class UserSearchView(ReplicaReadMixin, ValuesListMixin, generics.ListAPIView):
     """
     View for searching users.
     """
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    read_serializer_class = UserReadSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [UserSearchFilter]
     search_fields = ["first_name", "last_name", "=email"]
 
 
 @extend_schema(description="Get User friend list", methods=["GET"])
-class UserFriendsList(generics.ListAPIView):
+class UserFriendsList(ReplicaReadMixin, ValuesListMixin, generics.ListAPIView):
     """
     View for listing user's friends.
     """
 
-    serializer_class = UserfriendSerializer
+    serializer_class = UserSerializer
+    read_serializer_class = UserReadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return self.request.user.friends.order_by("id")
+
+
+@extend_schema(
+    description="Get the current user with their friend and pending request counts",
+    methods=["GET"],
+)
+class UserSummaryView(generics.RetrieveAPIView):
+    """
+    View for the current user's profile summary.
+    """
+
+    serializer_class = UserSummarySerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self):
+        # request.user may be a cached snapshot, so read the counters afresh.
+        return User.objects.only(*UserSummarySerializer.Meta.fields).get(
+            pk=self.request.user.pk
+        )
+
+
+@extend_schema(description="Get friends shared with another user", methods=["GET"])
+class MutualFriendsList(generics.ListAPIView):
+    """
+    View for listing the friends shared with another user, one page at a
+    time.
+    """
+
+    serializer_class = UserSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = MutualFriendsPagination
+
+    def get_queryset(self):
+        return mutual_friends(self.request.user.id, self.kwargs["user_id"])
+
+
+@extend_schema(
+    description="Friends of friends ranked by mutual friend count", methods=["GET"]
+)
+class FriendSuggestionsList(generics.ListAPIView):
+    """
+    View for listing "people you may know" suggestions.
+    """
+
+    serializer_class = FriendSuggestionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = None
+    suggestion_limit = 20
+    suggestion_fanout = 500
+    suggestion_per_friend = 500
 
     def get_queryset(self):
-        return User.objects.filter(username=self.request.user.username)
+        return friend_suggestions(
+            self.request.user.id,
+            limit=self.suggestion_limit,
+            fanout=self.suggestion_fanout,
+            per_friend=self.suggestion_per_friend,
+        )
 
 
 @extend_schema(description="Send Friend Request to User by User Id", methods=["POST"])
 @extend_schema(description="Get Pending Friend Request", methods=["GET"])
-class FriendshipRequestAPIView(viewsets.ModelViewSet):
+class FriendshipRequestAPIView(
+    ReplicaReadMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     """
     ViewSet for managing friendship requests.
     """
 
     serializer_class = FriendshipRequestSerializer
+    read_serializer_class = FriendshipRequestReadSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = PendingRequestPagination
+    throttle_scope = "friend_request"
     http_method_names = [
         "get",
         "post",
@@ -111,33 +258,71 @@ class FriendshipRequestAPIView(viewsets.ModelViewSet):
     ]
 
     def get_queryset(self):
-        return Friendship.objects.filter(to_user=self.request.user, status="pending")
-
-    @extend_schema(request=None, methods=["PUT"])
-    @extend_schema(description="Accept friend request", methods=["PUT"])
-    @action(detail=True, methods=["put"])
-    def accept_request(self, request, *args, **kwargs):
+        queryset = Friendship.objects.filter(
+            to_user=self.request.user, status="pending"
+        )
+        if self.action == "list":
+            # The read serializer fetches the sender's columns in the same
+            # query, through a join.
+            queryset = queryset.order_by("-created_at", "-id")
+        return queryset
+
+    def get_throttles(self):
+        # Only sending requests is rate limited, and only requests that were
+        # created count: perform_create records the hit after the insert, so
+        # duplicates and other rejected requests do not use up the quota.
+        if self.action == "create":
+            return [SlidingWindowThrottle(record=False)]
+        return super().get_throttles()
+
+    def throttled(self, request, wait):
+        raise Throttled(wait, detail="Exceeded the limit of sending friend requests.")
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        SlidingWindowThrottle().take(self.request, self, 1)
+        pin_to_primary(self.request.user.pk, serializer.instance.to_user_id)
+
+    def respond_to_request(self, status):
         """
-        Accept a friendship request.
+        Move the pending request to ``status``.
+
+        The change is a conditional ``UPDATE ... WHERE status = 'pending'``,
+        so of several concurrent accept/reject calls exactly one succeeds.
+        Accepting also inserts both friendship edges in a single statement.
         """
         friendship_request = self.get_object()
-        if request.user != friendship_request.to_user:
+        if self.request.user.pk != friendship_request.to_user_id:
             raise BaseException(status_code=400, details="Unauthenticated request Id")
-        else:
-            if friendship_request.status != "pending":
+
+        with transaction.atomic():
+            updated = Friendship.objects.filter(
+                pk=friendship_request.pk, status="pending"
+            ).update(status=status)
+            if not updated:
+                friendship_request.refresh_from_db(fields=["status"])
                 raise BaseException(
                     status_code=400,
                     details=f"its a {friendship_request.status} request",
                 )
 
-            friendship_request.status = "accepted"
-            friendship_request.save()
-            sender = friendship_request.from_user
-            receiver = friendship_request.to_user
+            adjust_counts("pending_request_count", {friendship_request.to_user_id: -1})
+            if status == "accepted":
+                add_friend_edges(
+                    [(friendship_request.from_user_id, friendship_request.to_user_id)]
+                )
 
-            sender.friends.add(receiver)
-            receiver.friends.add(sender)
+        pin_to_primary(friendship_request.from_user_id, friendship_request.to_user_id)
+        return friendship_request
 
+    @extend_schema(request=None, methods=["PUT"])
+    @extend_schema(description="Accept friend request", methods=["PUT"])
+    @action(detail=True, methods=["put"])
+    def accept_request(self, request, *args, **kwargs):
+        """
+        Accept a friendship request.
+        """
+        self.respond_to_request("accepted")
         return Response({"message": "Friendship request accepted."})
 
     @extend_schema(request=None, methods=["PUT"])
@@ -147,20 +332,208 @@ class FriendshipRequestAPIView(viewsets.ModelViewSet):
         """
         Reject a friendship request.
         """
-        friendship_request = self.get_object()
-        if request.user != friendship_request.to_user:
-            raise BaseException(status_code=400, details="Unauthenticated request Id")
-        else:
-            if friendship_request.status != "pending":
-                raise BaseException(
-                    status_code=400,
-                    details=f"its a {friendship_request.status} request",
-                )
+        self.respond_to_request("rejected")
+        return Response({"message": "Friendship request rejected."})
 
-            friendship_request.status = "rejected"
-            friendship_request.save()
+    @extend_schema(
+        request=BulkFriendshipRequestSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        description="Send friend requests to several users by User Id",
+        methods=["POST"],
+    )
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_send(self, request, *args, **kwargs):
+        """
+        Send friendship requests to a list of users.
 
-        return Response({"message": "Friendship request rejected."})
+        The same rules as for a single request apply to each item, checked
+        with one query for the users and one for existing requests. Every
+        item counts against the friend request rate limit. The valid requests
+        are inserted with one ``bulk_create``.
+        """
+        serializer = BulkFriendshipRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        to_user_ids = list(dict.fromkeys(serializer.validated_data["to_users"]))
+        from_user_id = request.user.pk
+
+        existing_ids = set(
+            User.objects.filter(pk__in=to_user_ids).values_list("pk", flat=True)
+        )
+        sent, received = set(), set()
+        for sender_id, receiver_id in Friendship.objects.filter(
+            Q(from_user=from_user_id, to_user__in=to_user_ids)
+            | Q(from_user__in=to_user_ids, to_user=from_user_id)
+        ).values_list("from_user", "to_user"):
+            if sender_id == from_user_id:
+                sent.add(receiver_id)
+            else:
+                received.add(sender_id)
+
+        errors = {}
+        for to_user_id in to_user_ids:
+            if to_user_id == from_user_id:
+                errors[to_user_id] = "User can't send request to self"
+            elif to_user_id not in existing_ids:
+                errors[
+                    to_user_id
+                ] = f'Invalid pk "{to_user_id}" - object does not exist.'
+            elif friend_cache.are_friends(from_user_id, to_user_id):
+                errors[to_user_id] = "Already friends."
+            elif to_user_id in sent:
+                errors[to_user_id] = "Friendship request already exists."
+            elif to_user_id in received:
+                errors[to_user_id] = "Friendship request already received"
+
+        candidates = [
+            to_user_id for to_user_id in to_user_ids if to_user_id not in errors
+        ]
+        granted = (
+            SlidingWindowThrottle().take(request, self, len(candidates))
+            if candidates
+            else 0
+        )
+        for to_user_id in candidates[granted:]:
+            errors[to_user_id] = "Exceeded the limit of sending friend requests."
+
+        created = self.create_requests(from_user_id, candidates[:granted], errors)
+        if created:
+            pin_to_primary(from_user_id, *created)
+        return Response(
+            [
+                {"to_user": to_user_id, "id": created[to_user_id]}
+                if to_user_id in created
+                else {"to_user": to_user_id, "error": errors[to_user_id]}
+                for to_user_id in to_user_ids
+            ]
+        )
+
+    @staticmethod
+    def create_requests(from_user_id, to_user_ids, errors):
+        """
+        Insert requests from ``from_user_id`` and return their ids by user.
+
+        If a concurrent request wins the race for a pair, the batch falls back
+        to one savepoint per item and records the losers in ``errors``; other
+        integrity errors are raised.
+        """
+        try:
+            with transaction.atomic():
+                friendship_requests = Friendship.objects.bulk_create(
+                    [
+                        Friendship(from_user_id=from_user_id, to_user_id=to_user_id)
+                        for to_user_id in to_user_ids
+                    ]
+                )
+                adjust_counts("pending_request_count", dict.fromkeys(to_user_ids, 1))
+            return {
+                friendship_request.to_user_id: friendship_request.pk
+                for friendship_request in friendship_requests
+            }
+        except IntegrityError:
+            created = {}
+            for to_user_id in to_user_ids:
+                try:
+                    with transaction.atomic():
+                        created[to_user_id] = Friendship.objects.create(
+                            from_user_id=from_user_id, to_user_id=to_user_id
+                        ).pk
+                        adjust_counts("pending_request_count", {to_user_id: 1})
+                except IntegrityError:
+                    pair = Friendship.objects.filter(
+                        Q(from_user=from_user_id, to_user=to_user_id)
+                        | Q(from_user=to_user_id, to_user=from_user_id)
+                    )
+                    if not pair.exists():
+                        # Not a duplicate, e.g. the user was deleted meanwhile.
+                        raise
+                    errors[to_user_id] = "Friendship request already exists."
+            return created
+
+    def bulk_respond(self, status):
+        """
+        Move several pending requests to ``status`` in one transaction.
+
+        The pending rows are locked with ``SELECT ... FOR UPDATE``, updated
+        with a single ``UPDATE`` and, when accepting, their friendship edges
+        are inserted with a single ``INSERT``.
+        """
+        serializer = FriendshipRequestIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        request_ids = list(dict.fromkeys(serializer.validated_data["ids"]))
+
+        with transaction.atomic():
+            pending = dict(
+                self.get_queryset()
+                .filter(pk__in=request_ids)
+                .select_for_update()
+                .values_list("pk", "from_user_id")
+            )
+            if pending:
+                updated = Friendship.objects.filter(
+                    pk__in=pending, status="pending"
+                ).update(status=status)
+                adjust_counts("pending_request_count", {self.request.user.pk: -updated})
+                if status == "accepted":
+                    add_friend_edges(
+                        [
+                            (sender_id, self.request.user.pk)
+                            for sender_id in pending.values()
+                        ]
+                    )
+        if pending:
+            pin_to_primary(self.request.user.pk, *pending.values())
+
+        missing = [
+            request_id for request_id in request_ids if request_id not in pending
+        ]
+        statuses = (
+            dict(
+                Friendship.objects.filter(
+                    pk__in=missing, to_user=self.request.user
+                ).values_list("pk", "status")
+            )
+            if missing
+            else {}
+        )
+        return Response(
+            [
+                {"id": request_id, "status": status}
+                if request_id in pending
+                else {
+                    "id": request_id,
+                    "error": f"its a {statuses[request_id]} request"
+                    if request_id in statuses
+                    else "Not found.",
+                }
+                for request_id in request_ids
+            ]
+        )
+
+    @extend_schema(
+        request=FriendshipRequestIdsSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        description="Accept several friend requests by request Id",
+        methods=["PUT"],
+    )
+    @action(detail=False, methods=["put"])
+    def bulk_accept(self, request, *args, **kwargs):
+        """
+        Accept several friendship requests.
+        """
+        return self.bulk_respond("accepted")
+
+    @extend_schema(
+        request=FriendshipRequestIdsSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        description="Reject several friend requests by request Id",
+        methods=["PUT"],
+    )
+    @action(detail=False, methods=["put"])
+    def bulk_reject(self, request, *args, **kwargs):
+        """
+        Reject several friendship requests.
+        """
+        return self.bulk_respond("rejected")
 
     def update(self, request, *args, **kwargs):
         """
@@ -168,3 +541,36 @@ class FriendshipRequestAPIView(viewsets.ModelViewSet):
         Raises MethodNotAllowed exception for regular PUT requests.
         """
         raise MethodNotAllowed("PUT")
+
+
+@extend_schema(exclude=True)
+class QueryStatsView(APIView):
+    """
+    Admin-only view of the per-view SQL statistics collected by
+    ``QueryInstrumentationMiddleware`` in this process, plus token cache
+    hit rates and connection pool checkouts and waits. ``DELETE`` resets
+    them.
+    """
+
+    permission_classes = [IsAdminUser]
+    pagination_class = None
+
+    def initial(self, request, *args, **kwargs):
+        if not getattr(settings, "QUERY_INSTRUMENTATION", False):
+            raise NotFound()
+        super().initial(request, *args, **kwargs)
+
+    def get(self, request):
+        return Response(
+            {
+                "views": query_stats.snapshot(),
+                "token_cache": token_cache.stats(),
+                "connection_pools": pool_stats(),
+            }
+        )
+
+    def delete(self, request):
+        query_stats.reset()
+        token_cache.reset_stats()
+        reset_pool_stats()
+        return Response(status=204)
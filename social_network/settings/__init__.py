@@ -0,0 +1,11 @@
+"""
+Settings profile picked by the ``DJANGO_ENV`` environment variable: ``dev``
+(the default) or ``prod``.
+"""
+
+import os
+
+if os.environ.get("DJANGO_ENV", "dev") == "prod":
+    from .prod import *  # noqa: F401,F403
+else:
+    from .dev import *  # noqa: F401,F403
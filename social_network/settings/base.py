@@ -0,0 +1,256 @@
+"""
+Django settings for social_network project, shared by the dev and prod
+profiles.
+
+Generated by 'django-admin startproject' using Django 4.2.2.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/4.2/ref/settings/
+"""
+
+import os
+from pathlib import Path
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+AUTH_USER_MODEL = "social_api.User"
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "rest_framework",
+    "rest_framework.authtoken",
+    "drf_spectacular",
+    "social_api",
+]
+
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "social_api.instrumentation.QueryInstrumentationMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+ROOT_URLCONF = "social_network.urls"
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [],
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.debug",
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = "social_network.wsgi.application"
+
+
+# Database
+# https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+
+# Connections are kept for DB_CONN_MAX_AGE seconds and checked before they are
+# reused. DB_POOL_SIZE > 0 switches to social_api.postgresql_pool, which caps
+# the connections of each worker process and returns them to the pool after
+# every request. DB_PGBOUNCER=1 is for pgbouncer in transaction mode, which
+# cannot keep the server-side cursors of iterator() between transactions.
+# Under ASGI (SERVER_INTERFACE=asgi, the default of social_network.asgi) sync
+# database work runs in threads that do not outlive the request, so their
+# connections are never reused: persistent ones would only pile up, and
+# DB_CONN_MAX_AGE is ignored. Use DB_POOL_SIZE to reuse connections there.
+SERVER_INTERFACE = os.environ.get("SERVER_INTERFACE", "wsgi")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 0))
+DB_CONN_MAX_AGE = (
+    0
+    if DB_POOL_SIZE or SERVER_INTERFACE == "asgi"
+    else int(os.environ.get("DB_CONN_MAX_AGE", 60))
+)
+
+DATABASES = {
+    "default": {
+        "ENGINE": (
+            "social_api.postgresql_pool"
+            if DB_POOL_SIZE
+            else "django.db.backends.postgresql"
+        ),
+        "NAME": "postgres",
+        "USER": "postgres",
+        "PASSWORD": "postgres",
+        "HOST": "db",
+        "PORT": 5432,
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "DISABLE_SERVER_SIDE_CURSORS": os.environ.get("DB_PGBOUNCER", "0") == "1",
+        "POOL_SIZE": DB_POOL_SIZE,
+        "POOL_TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+    }
+}
+
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2, become the aliases
+# replica1, replica2, ... with the primary's other settings. The search and
+# list endpoints read from them, except for users who wrote something in the
+# last REPLICA_PIN_SECONDS, see social_api.replicas.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), start=1
+):
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{number}")
+
+DATABASE_ROUTERS = ["social_api.replicas.PrimaryReplicaRouter"]
+REPLICA_PIN_CACHE_ALIAS = "default"
+REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Use a shared backend (e.g. django.core.cache.backends.redis.RedisCache) when
+# running more than one worker.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Per-user friend id sets, see social_api.cache.FriendCache.
+FRIEND_CACHE_ALIAS = "default"
+FRIEND_CACHE_MAX_BYTES = 64 * 1024 * 1024
+FRIEND_CACHE_LOCAL_TTL = 5
+FRIEND_CACHE_TIMEOUT = 60 * 60
+
+# Token key -> user snapshots, see social_api.authentication.TokenCache.
+# Deactivations or token deletions done outside the ORM (e.g. raw SQL) are
+# not evicted, and keep authenticating for up to TOKEN_CACHE_TIMEOUT seconds.
+TOKEN_CACHE_ALIAS = "default"
+TOKEN_CACHE_TIMEOUT = 60
+
+
+# Password validation
+# https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
+]
+
+# Password hashing
+# https://docs.djangoproject.com/en/4.2/topics/auth/passwords/
+# Lower PASSWORD_HASH_ITERATIONS for test and load-test environments only.
+
+PASSWORD_HASHERS = [
+    "social_api.hashing.ConfigurablePBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+PASSWORD_HASH_ITERATIONS = int(os.environ.get("PASSWORD_HASH_ITERATIONS", 600000))
+
+# Bounded process pool for hashing, see social_api.hashing.PasswordHashPool.
+# Every server worker starts its own pool, and gunicorn already runs about one
+# server worker per core, so one hashing process each keeps the cores busy.
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 1))
+PASSWORD_HASH_QUEUE_SIZE = int(
+    os.environ.get("PASSWORD_HASH_QUEUE_SIZE", 4 * PASSWORD_HASH_WORKERS)
+)
+PASSWORD_HASH_TIMEOUT = 10
+
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": (
+        "social_api.authentication.CachedTokenAuthentication",
+        "rest_framework.authentication.SessionAuthentication",
+    ),
+    "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    "DEFAULT_SCHEMA_CLASS": ("drf_spectacular.openapi.AutoSchema"),
+    "DEFAULT_PAGINATION_CLASS": "social_api.pagination.KeysetPagination",
+    "DEFAULT_RENDERER_CLASSES": (
+        "social_api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "social_api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    "DEFAULT_THROTTLE_RATES": {
+        "friend_request": "3/min",
+        "login": "10/min",
+        "register": "10/min",
+    },
+}
+
+# Counters for social_api.throttling: "cache" shares them through the cache
+# named by RATE_LIMIT_CACHE_ALIAS, "memory" keeps them per process.
+RATE_LIMIT_BACKEND = "cache"
+RATE_LIMIT_CACHE_ALIAS = "default"
+
+# Serve the search, friend list and pending request reads from async views;
+# asgi.py turns this on.
+ASYNC_READ_VIEWS = os.environ.get("ASYNC_READ_VIEWS", "0") == "1"
+
+# Rendered OpenAPI documents survive restarts here until the code changes.
+SCHEMA_CACHE_FILE = os.environ.get(
+    "SCHEMA_CACHE_FILE", BASE_DIR / ".cache" / "openapi-schema.json"
+)
+
+# Per-request SQL counts and timings in a Server-Timing header, aggregated at
+# /debug/query_stats/. The middleware drops out of the chain when disabled.
+QUERY_INSTRUMENTATION = os.environ.get("QUERY_INSTRUMENTATION", "0") == "1"
+
+# Internationalization
+# https://docs.djangoproject.com/en/4.2/topics/i18n/
+
+LANGUAGE_CODE = "en-us"
+
+TIME_ZONE = "UTC"
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/4.2/howto/static-files/
+
+STATIC_URL = "static/"
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -0,0 +1,13 @@
+"""
+Development settings: debug mode and the built-in runserver.
+"""
+
+from .base import *  # noqa: F401,F403
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = "django-insecure-%pupt*+v%o+#v*4*%3zc+mjnyc=(fgo0z^dy0x_9n7*g*x(r&%"
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+ALLOWED_HOSTS = ["*"]
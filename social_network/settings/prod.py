@@ -0,0 +1,43 @@
+"""
+Production settings, for the gunicorn launcher (see ``gunicorn.conf.py``).
+
+https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+
+SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY")
+if not SECRET_KEY:
+    raise ImproperlyConfigured("Set DJANGO_SECRET_KEY to run with DJANGO_ENV=prod.")
+
+# Debug mode also keeps every SQL query of a request in connection.queries.
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "*").split(",") if host
+]
+
+# Workers are separate processes, so the token and friend caches, the rate
+# limit counters and the replica pins must live in a shared cache: with the
+# per-process default a revoked token keeps working on other workers and the
+# rate limits are multiplied by the number of workers.
+REDIS_URL = os.environ.get("REDIS_URL")
+if not REDIS_URL:
+    raise ImproperlyConfigured("Set REDIS_URL to run with DJANGO_ENV=prod.")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "root": {"handlers": ["console"], "level": "WARNING"},
+}
@@ -0,0 +1,7 @@
+"""
+Test settings: the dev profile with a cheap password hash, used by pytest.
+"""
+
+from .dev import *  # noqa: F401,F403
+
+PASSWORD_HASH_ITERATIONS = 1000